@@ -6,15 +6,17 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
 
 from mediapoisk.plugin import plugin
-from mediapoisk.common import LocalizedError, notify, lang
+from mediapoisk.common import LocalizedError, notify, lang, store_scraper_state, dump_metrics
 from xbmcswift2 import xbmcgui
 
+# Fetches left after the listing (e.g. details of fast lists) are best-effort: the plugin call
+# waits for them at most that long, queued ones are cancelled then and running ones are
+# only waited for to complete (bounded by the scraper timeout)
+PENDING_FETCHES_TIMEOUT = 5
+
 if __name__ == '__main__':
     try:
-        import mediapoisk.plugin.main
-        import mediapoisk.plugin.contextmenu
-        import mediapoisk.plugin.search
-        import mediapoisk.plugin.advancedsearch
+        import mediapoisk.plugin.routes
         plugin.run()
     except LocalizedError as e:
         e.log()
@@ -24,3 +26,6 @@ if __name__ == '__main__':
             notify(e.localized)
         if e.kwargs.get('check_settings'):
             plugin.open_settings()
+    finally:
+        store_scraper_state(PENDING_FETCHES_TIMEOUT)
+        dump_metrics(path=sys.argv[0])
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTML fixtures for the scraper benchmarks.
+
+Pages follow the markup of mediapoisk.info that MediaPoiskScraper parses, with a
+configurable number of search results, folders and files. Generation is
+deterministic, so the same parameters always give the same pages.
+"""
+
+from __future__ import unicode_literals
+
+FLAGS = ["новинка", "новое качество", "новые серии"]
+FORMATS = ["AVI", "HD-rip", "HD-rip 1080"]
+VIDEO_QUALITIES = ["(4) DVD-рип", "(5) HD-рип", "(4) Web-DL", "(3) HDTV"]
+AUDIO_QUALITIES = ["(4) профессиональный перевод", "(3) любительский многоголосый перевод",
+                   "(5) оригинальная дорожка/полный дубляж"]
+LANGUAGES = ["Русский", "Английский", "Немецкий", "Французский"]
+GENRES = ["Драма", "Боевик", "Детектив", "Военный", "Исторический", "Биографический"]
+COUNTRIES = ["Великобритания", "Германия", "Италия", "Канада", "Испания"]
+
+
+def _pick(items, i, count=1):
+    return [items[(i + j) % len(items)] for j in range(count)]
+
+
+def search_row(media_id, i):
+    return """
+<tr class="%(cls)s">
+  <td><img src="/images/flag.png" title="%(flag)s"></td>
+  <td><span title="2015-%(month)02d-%(day)02d 12:00:00">%(day)02d.%(month)02d</span></td>
+  <td><a href="/media_show_page.php?section=video&amp;id=%(id)d"><span class="title">Фильм №%(id)d</span>
+    <span class="subtitle">Movie #%(id)d</span></a></td>
+  <td><img src="/images/format.png" alt="%(fmt)s">
+    <span title="Видео: %(video)s, Звук: %(audio)s">%(id)d</span></td>
+  <td>%(languages)s</td>
+  <td>%(genres)s</td>
+  <td>%(countries)s</td>
+  <td>%(year)d</td>
+  <td>%(rating).1f</td>
+  <td>%(user_rating).1f</td>
+</tr>""" % {
+        'cls': 'odd' if i % 2 else 'even',
+        'flag': _pick(FLAGS, i)[0],
+        'month': i % 12 + 1,
+        'day': i % 28 + 1,
+        'id': media_id,
+        'fmt': _pick(FORMATS, i)[0],
+        'video': _pick(VIDEO_QUALITIES, i)[0],
+        'audio': _pick(AUDIO_QUALITIES, i)[0],
+        'languages': "".join('<img src="/images/lang.png" alt="%s">' % l for l in _pick(LANGUAGES, i, 2)),
+        'genres': ", ".join('<a href="/genre.php">%s</a>' % g for g in _pick(GENRES, i, 3)),
+        'countries': ", ".join('<a href="/country.php">%s</a>' % c for c in _pick(COUNTRIES, i, 2)),
+        'year': 1990 + i % 25,
+        'rating': 5 + i % 50 / 10.0,
+        'user_rating': 4 + i % 60 / 10.0,
+    }
+
+
+def search_page(page_size, first_id=1000):
+    """Search results page (media_page.php) with page_size rows"""
+    rows = "".join(search_row(first_id + i, i) for i in range(page_size))
+    return """<html><head><title>mediapoisk.info</title></head><body>
+<table class="zebra">
+<tr class="navbar"><td colspan="10">Страницы: <b>1</b> <a href="?skip=%(size)d">2</a></td></tr>
+%(rows)s
+</table>
+</body></html>""" % {'size': page_size, 'rows': rows}
+
+
+def file_row(folder_id, file_id, i):
+    return """
+<tr>
+  <td><img src="/images/flag.png" alt="%(flag)s"></td>
+  <td><a href="/playlist.php?cid=%(cid)d&amp;fid=%(fid)d">torrent</a></td>
+  <td>Серия %(n)d</td>
+  <td></td>
+  <td>00:%(min)02d:%(sec)02d</td>
+  <td>%(fmt)s</td>
+  <td>1280x720</td>
+</tr>""" % {'flag': _pick(FLAGS, i)[0], 'cid': folder_id, 'fid': file_id, 'n': i + 1,
+            'min': 20 + i % 40, 'sec': i % 60, 'fmt': 'MKV'}
+
+
+def files_table(folder_ids, files):
+    rows = "".join(file_row(folder_id, folder_id * 1000 + i, i) for folder_id in folder_ids for i in range(files))
+    return """
+<tr class="files"><td colspan="3"><table>
+<tr><th></th><th>Торрент</th><th>Название</th><th></th><th>Длительность</th><th>Формат</th><th>Разрешение</th></tr>
+%s
+</table></td></tr>""" % rows
+
+
+def copy_table(folder_id, i):
+    return """
+<table class="copy" id="copy%(id)d">
+<tr>
+  <td class="copy_title"><img src="/images/format.png" alt="%(fmt)s"><img src="/images/flag.png" alt="%(flag)s">
+    Копия %(n)d</td>
+  <td class="server"><a href="/playlist.php?cid=%(id)d">torrent</a></td>
+  <td class="br">
+    <p>Язык: <img class="flag" alt="%(lang1)s"><img class="flag" alt="%(lang2)s"></p>
+    <p>Качество звука: %(audio)s</p>
+    <p>Качество изображения: %(video)s</p>
+    <p>Встроенные субтитры: <img class="flag" alt="%(lang2)s"></p>
+    <p>Размер файлов: %(size).2f GB</p>
+  </td>
+</tr>
+</table>""" % {
+        'id': folder_id,
+        'n': i + 1,
+        'fmt': _pick(FORMATS, i)[0],
+        'flag': _pick(FLAGS, i)[0],
+        'lang1': _pick(LANGUAGES, i)[0],
+        'lang2': _pick(LANGUAGES, i + 1)[0],
+        'audio': _pick(AUDIO_QUALITIES, i)[0],
+        'video': _pick(VIDEO_QUALITIES, i)[0],
+        'size': 1.5 + i,
+    }
+
+
+def media_page(media_id, folders=1, files=10, folder_id=None):
+    """
+    Media page (media_show_page.php) with details and the given number of folders
+    with files each. Files of all folders are listed in one table after the
+    folders. With folder_id given, only that folder is on the page
+    (media_show_page.php?cid=...).
+    """
+    folder_ids = [folder_id] if folder_id else [media_id * 100 + i for i in range(folders)]
+    copies = "".join(copy_table(fid, i) for i, fid in enumerate(folder_ids))
+    if files:
+        copies += "<table>%s</table>" % files_table(folder_ids, files)
+    return """<html><head><title>mediapoisk.info</title></head><body><table><tr>
+<td class="contents">
+<table class="infobar"><tr>
+  <td><span class="title">Фильм №%(id)d</span><span class="subtitle">Movie #%(id)d</span></td>
+  <td>%(genres)s<br>%(countries)s, %(year)d</td>
+  <td>Рейтинг пользователей: 7.50<br>IMDB: 8.10</td>
+</tr></table>
+<p class="property">Дата премьеры: <span>1 марта 2014</span></p>
+<p class="property">Дата российской премьеры: <span>13 марта 2014</span></p>
+<p class="property">Студия: <span><a href="/studio.php">Studio A</a>, <a href="/studio.php">Studio B</a></span></p>
+<p class="property">Создатели: <span><a href="/people.php">Creator One</a>, <a href="/people.php">Creator Two</a></span></p>
+<p class="property">В ролях: <span>%(actors)s</span></p>
+<div class="media_pic"><a href="/posters/%(id)d.jpg"><img src="/posters/%(id)d_small.jpg"></a></div>
+<div style="display:table-cell;padding:5px">%(plot)s</div>
+<div id="imgsContainer">%(screenshots)s</div>
+<table class="copies"><tr><td>
+%(copies)s
+</td></tr></table>
+</td>
+</tr></table></body></html>""" % {
+        'id': media_id,
+        'genres': ", ".join(_pick(GENRES, media_id, 3)),
+        'countries': ", ".join(_pick(COUNTRIES, media_id, 2)),
+        'year': 1990 + media_id % 25,
+        'actors': ", ".join('<a href="/people.php">Actor %d</a>' % i for i in range(12)),
+        'plot': "Описание фильма. " * 40,
+        'screenshots': "".join('<a href="/screens/%d_%d.jpg"><img></a>' % (media_id, i) for i in range(6)),
+        'copies': copies,
+    }
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline benchmark of the MediaPoisk scraper hot paths.
+
+Pages are served by a stub HTTP client, from generated fixtures (see fixtures.py)
+or from recorded pages, so no network is needed. Measured are search page parsing,
+paging through search results (with and without a search window),
+details parsing, folders and files parsing (also its scaling with the number of
+folders on the page) and bulk fetching with different page sizes and worker
+counts (also with a slow tail of requests, with and without hedging). Results
+are printed (or saved) as JSON, and a previous result file can be given to
+compare against:
+
+    python benchmarks/scraper.py -o before.json
+    python benchmarks/scraper.py --compare before.json
+
+Recorded pages are read from a directory with --pages, as media_page.html,
+media_show_page.html and (optionally) media_show_page_cid.html; page size
+parameters are ignored then.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import platform
+import threading
+import subprocess
+import optparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'resources', 'lib'))
+
+import fixtures
+from mediapoisk.enumerations import Section
+from mediapoisk.scraper import MediaPoiskScraper
+from mediapoisk.searchfilter import MediaPoiskSearchFilter
+from util.hedging import Hedger
+
+
+class StubResponse(object):
+    def __init__(self, url, body):
+        self.url = url
+        self.body = body
+        self.headers = {}
+        self.code = 200
+
+
+class StubHttpClient(object):
+    """
+    Replaces util.httpclient.HttpClient, serving pages from a callable with
+    optional simulated network latency; every slow_every-th request is slow_factor
+    times slower
+    """
+
+    def __init__(self, pages, latency=0.0, slow_every=0, slow_factor=10):
+        self.pages = pages
+        self.latency = latency
+        self.slow_every = slow_every
+        self.slow_factor = slow_factor
+        self.cookie_jar = None
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, request, **kwargs):
+        url = getattr(request, 'url', request)
+        with self.lock:
+            self.requests += 1
+            slow = self.slow_every and self.requests % self.slow_every == 0
+        if self.latency:
+            time.sleep(self.latency * self.slow_factor if slow else self.latency)
+        return StubResponse(url, self.pages(url))
+
+
+class GeneratedPages(object):
+    def __init__(self, page_size=50, folders=1, files=10):
+        self.page_size = page_size
+        self.folders = folders
+        self.files = files
+        self.cache = {}
+
+    def __call__(self, url):
+        if url not in self.cache:
+            if 'media_page.php' in url:
+                page = fixtures.search_page(self.page_size)
+            else:
+                media_id = int(re.search(r'[?&]id=(\d+)', url).group(1))
+                cid = re.search(r'[?&]cid=(\d+)', url)
+                page = fixtures.media_page(media_id, self.folders, self.files, cid and int(cid.group(1)))
+            self.cache[url] = page.encode('utf-8')
+        return self.cache[url]
+
+
+class RecordedPages(object):
+    def __init__(self, path):
+        self.pages = {}
+        for name in ['media_page', 'media_show_page', 'media_show_page_cid']:
+            filename = os.path.join(path, name + '.html')
+            if os.path.exists(filename):
+                with open(filename, 'rb') as f:
+                    self.pages[name] = f.read()
+
+    def __call__(self, url):
+        if 'media_page.php' in url:
+            return self.pages['media_page']
+        if 'cid=' in url and 'media_show_page_cid' in self.pages:
+            return self.pages['media_show_page_cid']
+        return self.pages['media_show_page']
+
+
+def make_scraper(pages, workers=10, latency=0.0, slow_every=0, hedger=None, search_window=0):
+    return MediaPoiskScraper(http_client=StubHttpClient(pages, latency, slow_every), max_workers=workers,
+                             hedger=hedger, search_window=search_window)
+
+
+def measure(func, runs):
+    func()  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.time()
+        func()
+        timings.append((time.time() - started) * 1000)
+    timings.sort()
+    return {
+        'runs': runs,
+        'min_ms': timings[0],
+        'median_ms': timings[len(timings) // 2],
+        'mean_ms': sum(timings) / len(timings),
+        'max_ms': timings[-1],
+    }
+
+
+def bench_search(pages_factory, runs):
+    for page_size in [10, 25, 50, 100]:
+        scraper = make_scraper(pages_factory(page_size=page_size))
+        search_filter = MediaPoiskSearchFilter(Section.MOVIES, page_size=page_size)
+        yield 'search', {'page_size': page_size}, measure(lambda: scraper.search(search_filter), runs)
+
+
+def bench_search_paging(pages_factory, runs, latency):
+    # the first page and paging through 8 pages of 30 results, with and without a search window
+    for pages_count in [1, 8]:
+        for window in [0, 120, 240]:
+            pages = pages_factory(page_size=window or 30)
+            search_filter = MediaPoiskSearchFilter(Section.MOVIES, page_size=30)
+            scrapers = []
+
+            def run():
+                scraper = make_scraper(pages, latency=latency, search_window=window)
+                scrapers.append(scraper)
+                for skip in range(0, pages_count * 30, 30):
+                    scraper.search_cached(search_filter, skip or None)
+            stats = measure(run, runs)
+            stats['requests'] = scrapers[-1].http_client.requests
+            yield 'search_paging', {'pages': pages_count, 'page_size': 30, 'window': window,
+                                    'latency_ms': latency * 1000}, stats
+
+
+def bench_parse_details(pages_factory, runs):
+    for folders in [1, 10]:
+        pages = pages_factory(folders=folders, files=10)
+        html = pages('/media_show_page.php?section=video&id=1000')
+        scraper = make_scraper(pages)
+        yield '_parse_details', {'folders': folders}, \
+            measure(lambda: scraper._parse_details(html, Section.MOVIES, 1000), runs)
+
+
+def bench_get_folders(pages_factory, runs):
+    for folders, files in [(1, 10), (1, 100), (5, 20), (10, 50)]:
+        scraper = make_scraper(pages_factory(folders=folders, files=files))
+        yield 'get_folders', {'folders': folders, 'files': files}, \
+            measure(lambda: scraper.get_folders(Section.SERIES, 1000), runs)
+
+
+def bench_get_folders_scaling(pages_factory, runs):
+    # series page with a growing number of copies, time per file row should stay flat
+    for folders in [1, 5, 10, 20, 40]:
+        scraper = make_scraper(pages_factory(folders=folders, files=20))
+        stats = measure(lambda: scraper.get_folders(Section.SERIES, 1000), runs)
+        stats['us_per_row'] = stats['median_ms'] * 1000 / (folders * 20)
+        yield 'get_folders_scaling', {'folders': folders, 'files': 20}, stats
+
+
+def bench_get_details_bulk(pages_factory, runs, latency):
+    for count in [10, 50]:
+        for workers in [1, 5, 10]:
+            pages = pages_factory()
+            media_ids = range(1000, 1000 + count)
+
+            def run():
+                # fresh caches, so that every run fetches all pages
+                scraper = make_scraper(pages, workers, latency)
+                scraper.get_details_bulk(Section.MOVIES, media_ids)
+                scraper.executor.shutdown()
+            yield 'get_details_bulk', {'count': count, 'workers': workers, 'latency_ms': latency * 1000}, \
+                measure(run, runs)
+
+
+def bench_get_details_bulk_tail(pages_factory, runs, latency):
+    # every 20th request is 10 times slower, with and without hedging
+    for percentile in [0, 90, 95]:
+        pages = pages_factory()
+        media_ids = range(1000, 1050)
+        hedger = Hedger(percentile=percentile, max_extra=0.1) if percentile else None
+
+        def run():
+            scraper = make_scraper(pages, 10, latency, slow_every=20, hedger=hedger)
+            scraper.get_details_bulk(Section.MOVIES, media_ids)
+            scraper.executor.shutdown()
+        stats = measure(run, runs)
+        if hedger:
+            stats.update(hedges_fired=hedger.fired, hedges_won=hedger.won)
+        yield 'get_details_bulk_tail', {'count': 50, 'workers': 10, 'latency_ms': latency * 1000,
+                                        'hedge_percentile': percentile}, stats
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.STDOUT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    key = lambda r: (r['name'], json.dumps(r['params'], sort_keys=True))
+    before = dict((key(r), r) for r in baseline['results'])
+    print >> sys.stderr, "%-20s %-45s %10s %10s %7s" % ("benchmark", "params", "before, ms", "after, ms", "ratio")
+    for r in results['results']:
+        b = before.get(key(r))
+        if b:
+            print >> sys.stderr, "%-20s %-45s %10.2f %10.2f %7.2f" % (
+                r['name'], json.dumps(r['params'], sort_keys=True), b['median_ms'], r['median_ms'],
+                r['median_ms'] / b['median_ms'] if b['median_ms'] else 0)
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--runs', type='int', default=10, help="runs per benchmark")
+    parser.add_option('-l', '--latency', type='float', default=20, help="simulated latency for bulk fetching, ms")
+    parser.add_option('-b', '--benchmark', action='append', help="run only given benchmark(s)")
+    parser.add_option('-p', '--pages', help="directory with recorded pages")
+    parser.add_option('-o', '--output', help="write JSON results to the file instead of stdout")
+    parser.add_option('-c', '--compare', help="JSON results of a previous run to compare with")
+    options, args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    if options.pages:
+        recorded = RecordedPages(options.pages)
+        pages_factory = lambda **kwargs: recorded
+    else:
+        pages_factory = GeneratedPages
+
+    benchmarks = [
+        ('search', lambda: bench_search(pages_factory, options.runs)),
+        ('search_paging', lambda: bench_search_paging(pages_factory, options.runs, options.latency / 1000.0)),
+        ('_parse_details', lambda: bench_parse_details(pages_factory, options.runs)),
+        ('get_folders', lambda: bench_get_folders(pages_factory, options.runs)),
+        ('get_folders_scaling', lambda: bench_get_folders_scaling(pages_factory, options.runs)),
+        ('get_details_bulk', lambda: bench_get_details_bulk(pages_factory, options.runs, options.latency / 1000.0)),
+        ('get_details_bulk_tail', lambda: bench_get_details_bulk_tail(pages_factory, options.runs,
+                                                                      options.latency / 1000.0)),
+    ]
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pages': options.pages or 'generated',
+        'results': [],
+    }
+    for name, bench in benchmarks:
+        if options.benchmark and name not in options.benchmark:
+            continue
+        for bench_name, params, stats in bench():
+            stats.update(name=bench_name, params=params)
+            results['results'].append(stats)
+            print >> sys.stderr, "%-20s %-45s %8.2f ms" % (bench_name, json.dumps(params, sort_keys=True),
+                                                          stats['median_ms'])
+
+    if options.compare:
+        with open(options.compare) as f:
+            compare(results, json.load(f))
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Plugin cold start benchmark.
+
+Measures the time it takes to import the view modules needed to dispatch a route,
+each sample in a fresh interpreter. Compares the eager mode (all view modules are
+imported up front, as addon.py used to do) with the lazy route table. Use
+--eager-only to get comparable numbers from older revisions.
+
+Run from the addon root with the same Python 2 interpreter Kodi uses:
+
+    python benchmarks/startup.py [-n RUNS] [path ...]
+
+Time spent importing xbmcswift2 itself (and the mocked xbmc modules in CLI mode)
+is not included, since it is the same for both modes.
+"""
+
+import os
+import sys
+import subprocess
+import optparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = ['/', '/history/clear', '/search/clear', '/refresh', '/search/video', '/explore/video']
+
+EAGER_MODULES = ['mediapoisk.plugin.main', 'mediapoisk.plugin.contextmenu',
+                 'mediapoisk.plugin.search', 'mediapoisk.plugin.advancedsearch']
+
+SAMPLE = """
+import sys, time, logging
+sys.path.insert(0, %(lib)r)
+logging.disable(logging.CRITICAL)
+from mediapoisk.plugin import plugin
+started = time.time()
+if %(lazy)r:
+    import mediapoisk.plugin.routes
+else:
+    for name in %(modules)r:
+        __import__(name)
+# resolve the view as plugin.run() would, without calling it
+for rule in plugin._routes:
+    if rule.regex.match(%(path)r):
+        getattr(rule.view_func, 'resolve', lambda: None)()
+        break
+sys.stdout.write('%%f' %% ((time.time() - started) * 1000))
+"""
+
+
+def sample(path, lazy):
+    code = SAMPLE % {'lib': os.path.join(ROOT, 'resources', 'lib'), 'lazy': lazy,
+                     'modules': EAGER_MODULES, 'path': path}
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    if proc.returncode:
+        raise RuntimeError(err)
+    return float(out)
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [-n RUNS] [path ...]")
+    parser.add_option('-n', '--runs', type='int', default=15, help="samples per path and mode")
+    parser.add_option('--eager-only', action='store_true', help="don't measure the lazy route table")
+    options, paths = parser.parse_args()
+    paths = paths or DEFAULT_PATHS
+
+    # warm up, so that .pyc files are written before measuring
+    sample('/', False)
+
+    if options.eager_only:
+        print "%-20s %10s" % ("path", "eager, ms")
+    else:
+        print "%-20s %10s %10s %8s" % ("path", "eager, ms", "lazy, ms", "ratio")
+    for path in paths:
+        eager = median([sample(path, False) for _ in range(options.runs)])
+        if options.eager_only:
+            print "%-20s %10.1f" % (path, eager)
+            continue
+        lazy = median([sample(path, True) for _ in range(options.runs)])
+        print "%-20s %10.1f %10.1f %8.2f" % (path, eager, lazy, lazy / eager)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,9 @@ class State:
 
 Status = namedtuple("Status", "state, status, progress, down_speed, up_speed, download, upload, peers, url, error")
 
+# Parsed STATUS line of the engine
+Transfer = namedtuple("Transfer", "status, progress, down_speed, up_speed, peers, download, upload")
+
 from engine import Engine
 from error import Error
 from sink import Sink
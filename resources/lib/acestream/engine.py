@@ -3,10 +3,13 @@
 import time
 import os
 import sys
+import re
 import logging
 import urllib
+import threading
 
-from . import State, Status
+from collections import deque
+from . import State, Status, Transfer
 from sink import Sink
 from error import Error
 
@@ -22,10 +25,24 @@ class Engine:
 
     DEFAULT_HOST = "127.0.0.1"
     DEFAULT_PORT = 62062
+    # Only the last events are kept, when nobody waits for them (e.g. between plays)
+    MAX_EVENTS = 100
+
+    STATUS_RE = re.compile("main:([a-z]+)")
+    # Positions of progress, down_speed, up_speed, peers, download and upload in STATUS params
+    STATUS_FIELDS = {
+        'prebuf': (1, 5, 7, 8, 10, 12),
+        'buf': (1, 5, 7, 8, 10, 12),
+        'dl': (1, 3, 5, 6, 8, 10),
+    }
 
     def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, save_path=None, save_encrypted=False,
-                 log=None, on_playback_resumed=None, on_playback_paused=None, on_poll=None):
+                 log=None, on_playback_resumed=None, on_playback_paused=None, on_poll=None, keep_alive=False):
+        """
+        :param keep_alive: Don't shut down local engine on close, so next connection doesn't have to start it again
+        """
         self.log = log or logging.getLogger(__name__)
+        self.keep_alive = keep_alive
         self.state = None
         self.host = host
         self.port = port
@@ -38,13 +55,7 @@ class Engine:
         self.files = None
         self.key = None
         self.version = None
-        self.status = None
-        self.progress = 0
-        self.down_speed = 0
-        self.up_speed = 0
-        self.peers = 0
-        self.download = 0
-        self.upload = 0
+        self.transfer = Transfer(status=None, progress=0, down_speed=0, up_speed=0, peers=0, download=0, upload=0)
         self.save_path = save_path
         self.save_indexes = []
         self.save_encrypted = save_encrypted
@@ -58,7 +69,23 @@ class Engine:
         self.auth_level = None
         self.infohash = None
         self.ready = False
-        self.on_poll = on_poll or time.sleep
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        self.events_cond = threading.Condition()
+        self.on_poll = on_poll or self.wait_event
+
+    def wait_event(self, timeout=None):
+        """
+        Wait for any event received from the engine, returns the last received (event, params) pair
+        or None on timeout
+        """
+        with self.events_cond:
+            if not self.events:
+                self.events_cond.wait(timeout)
+            if not self.events:
+                return None
+            event = self.events[-1]
+            self.events.clear()
+            return event
 
     def on_start(self, duration):
         self.duration = duration * 1000
@@ -88,12 +115,37 @@ class Engine:
         if self.sink:
             if self.state > 0:
                 self.on_stop()
-            self.sink.send("SHUTDOWN")
+            if self.keep_alive:
+                self.disconnect()
+            else:
+                self.sink.send("SHUTDOWN")
 
     def shutdown(self):
         if self.sink:
             self.sink.end()
 
+    def shutdown_engine(self):
+        """
+        Shut down the engine even in keep-alive mode
+        """
+        if self.sink:
+            self.sink.send("SHUTDOWN")
+            self.disconnect()
+
+    def disconnect(self):
+        """
+        Close the connection leaving the engine running
+        """
+        if self.sink:
+            self.sink.end()
+            self.sink.close()
+            self.sink = None
+        self.state = None
+        self.link = None
+        self.files = None
+        self.error = False
+        self.error_msg = None
+
     def _start(self):
         if not self._is_local():
             return True
@@ -107,7 +159,7 @@ class Engine:
             except Error:
                 self._start_android()
 
-    def connect(self, timeout=20):
+    def connect(self, timeout=20, start_engine=True):
         if not self.sink:
             self.sink = Sink(self.host, on_receive=self.track_sink_event)
         start = time.time()
@@ -121,13 +173,13 @@ class Engine:
                     self.sink.send("HELLOBG")
                     connected = True
                 except Error as error:
-                    if not started:
+                    if not started and start_engine:
                         self._start()
                         started = True
             self.on_poll(self.POLL_DELAY)
         if not self.is_ready():
             self.sink = None
-            raise error
+            raise error or Error("Timeout while connecting to AceStream engine", Error.TIMEOUT)
 
     @staticmethod
     def _unique_id():
@@ -221,9 +273,10 @@ class Engine:
         self._start_play(timeout)
 
     def get_status(self):
-        return Status(state=self.state, status=self.status, progress=self.progress, down_speed=self.down_speed,
-                      up_speed=self.up_speed, peers=self.peers, url=self.link, error=self.error_msg,
-                      download=self.download, upload=self.upload)
+        transfer = self.transfer
+        return Status(state=self.state, status=transfer.status, progress=transfer.progress,
+                      down_speed=transfer.down_speed, up_speed=transfer.up_speed, peers=transfer.peers,
+                      url=self.link, error=self.error_msg, download=transfer.download, upload=transfer.upload)
 
     def _start_windows(self):
         import _winreg
@@ -365,6 +418,10 @@ class Engine:
         elif event == "SHUTDOWN":
             self.shutdown()
 
+        with self.events_cond:
+            self.events.append((event, params))
+            self.events_cond.notify_all()
+
     def _save_file(self, index, infohash, _format):
         import urllib
 
@@ -384,47 +441,26 @@ class Engine:
             self.saved_files[index] = path
 
     def _update_status(self, status_string):
-        import re
-
-        ss = re.compile("main:[a-z]+", re.S)
-        s1 = re.findall(ss, status_string)[0]
-        self.status = s1.split(":")[1]
+        """
+        Replaces the transfer status with a new one, so that readers always see a consistent status
+        """
+        match = self.STATUS_RE.search(status_string)
+        if not match:
+            return
+        status = match.group(1)
 
-        if self.status == "starting":
-            self.progress = 0
-        if self.status == "loading":
-            self.progress = 0
-        if self.status == "prebuf":
-            parts = status_string.split(";")
-            self.progress = int(parts[1])
-            self.down_speed = int(parts[5])
-            self.up_speed = int(parts[7])
-            self.peers = int(parts[8])
-            self.download = int(parts[10])
-            self.upload = int(parts[12])
-        if self.status == "buf":
+        if status in self.STATUS_FIELDS:
             parts = status_string.split(";")
-            self.progress = int(parts[1])
-            self.down_speed = int(parts[5])
-            self.up_speed = int(parts[7])
-            self.peers = int(parts[8])
-            self.download = int(parts[10])
-            self.upload = int(parts[12])
-        if self.status == "dl":
-            parts = status_string.split(";")
-            self.progress = int(parts[1])
-            self.down_speed = int(parts[3])
-            self.up_speed = int(parts[5])
-            self.peers = int(parts[6])
-            self.download = int(parts[8])
-            self.upload = int(parts[10])
-        if self.status == "check":
-            self.progress = int(status_string.split(";")[1])
-        if self.status == "idle":
-            self.progress = 0
-        if self.status == "wait":
-            self.progress = 0
-        if self.status == "err":
+            progress, down_speed, up_speed, peers, download, upload = \
+                [int(parts[i]) for i in self.STATUS_FIELDS[status]]
+            self.transfer = Transfer(status, progress, down_speed, up_speed, peers, download, upload)
+        elif status == "check":
+            self.transfer = self.transfer._replace(status=status, progress=int(status_string.split(";")[1]))
+        elif status in ["starting", "loading", "idle", "wait"]:
+            self.transfer = self.transfer._replace(status=status, progress=0)
+        else:
+            self.transfer = self.transfer._replace(status=status)
+        if status == "err":
             parts = status_string.split(";")
             self.error = True
             self.error_id = parts[1]
@@ -35,6 +35,13 @@ class Sink(threading.Thread):
     def end(self):
         self.active = False
 
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+            self.sock.close()
+        except socket.error:
+            pass
+
     def send(self, command):
         self.log.debug(">> %s" % command)
 
@@ -48,30 +55,19 @@ class Sink(threading.Thread):
 
         while self.active:
             try:
-                self.last_received = self.sock.recv(self.recv_buf_size)
+                received = self.sock.recv(self.recv_buf_size)
             except socket.error:
-                self.last_received = ""
+                received = ""
 
-            ind = self.last_received.find("\r\n")
-            cnt = self.last_received.count("\r\n")
+            if not received:
+                time.sleep(self.sleep_delay)
+                continue
 
-            if ind != -1 and cnt == 1:
-                self.last_received = self.temp + self.last_received[:ind]
-                self.temp = ""
+            lines = (self.temp + received).split("\r\n")
+            self.temp = lines.pop()
+            for line in lines:
+                self.last_received = line
                 self._exec_com()
-            elif cnt > 1:
-                fcom = self.last_received
-                ind = 1
-                while ind != -1:
-                    ind = fcom.find("\r\n")
-                    self.last_received = fcom[:ind]
-                    self._exec_com()
-                    fcom = fcom[(ind+2):]
-            elif ind == -1:
-                self.temp = self.temp + self.last_received
-                self.last_received = None
-
-            time.sleep(self.sleep_delay)
 
         self.log.info("Sink thread stopped")
 
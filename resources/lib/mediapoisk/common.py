@@ -8,7 +8,7 @@ import logging
 import threading
 
 from util.causedexception import CausedException
-from util.enum import Enum
+from util.frozenenum import FrozenEnum
 from util.ordereddict import OrderedDict
 from xbmcswift2 import CLI_MODE, xbmc, xbmcvfs, xbmcgui, direxists, ensure_unicode, ensure_fs_encoding
 from contextlib import closing
@@ -206,7 +206,15 @@ def get_dir_size(directory):
     return dir_size
 
 
+PREFETCH_MARKER_MAX_AGE = 24 * 60 * 60
+
+
 def purge_temp_dir():
+    marker_path = plugin.addon_data_path('t2h_prefetched')
+    if os.path.exists(marker_path) and time.time() - os.path.getmtime(marker_path) < PREFETCH_MARKER_MAX_AGE:
+        # next episode was prefetched to the temporary folder and isn't played yet
+        log.info("Prefetched torrent is not played yet, not purging temporary folder.")
+        return
     path = temp_path()
     temp_size = get_dir_size(path)
     max_size = plugin.get_setting('temp-max-size', int)*1024*1024*1024
@@ -259,19 +267,57 @@ def singleton(func):
             memoized.append(func())
         return memoized[0]
 
+    singleton_wrapper.created = lambda: bool(memoized)
     return singleton_wrapper
 
 
+def store_scraper_state(timeout=None):
+    """
+    Cache results of the scraper fetches left running after list deadlines and save
+    the learned concurrency limit
+
+    :param timeout: Max time to wait for the fetches, in seconds (scraper timeout by default)
+    """
+    from mediapoisk import container
+    if container.scraper.created():
+        container.scraper().store_pending(timeout)
+    if container.concurrency_limiter.created() and container.concurrency_limiter():
+        container.concurrency_limiter().save()
+
+
+# metrics.log is rotated to metrics.log.1 once it gets that large, so at most twice that is kept
+METRICS_LOG_MAX_SIZE = 1024 * 1024
+
+
+def dump_metrics(**extra):
+    """
+    Append collected metrics to metrics.log in the addon data folder, if enabled in settings
+    """
+    if not plugin.get_setting('dump-metrics', bool):
+        return
+    from mediapoisk import container
+    metrics = container.metrics()
+    if not metrics.is_empty():
+        try:
+            metrics.dump(plugin.addon_data_path('metrics.log'), METRICS_LOG_MAX_SIZE, **extra)
+        except IOError as e:
+            log.warn("Can't write metrics: %s", e)
+
+
 def batch(iterable, size=None):
+    """
+    Split iterable into lists of size items. By default the size is taken for every list, so that
+    it follows the adaptive concurrency limit
+    """
     from itertools import islice, chain
-    size = size or plugin.get_setting('batch-results', int)
+    from mediapoisk import container
     sourceiter = iter(iterable)
     while True:
-        batchiter = islice(sourceiter, size)
+        batchiter = islice(sourceiter, size or container.fetch_batch_size())
         yield list(chain([batchiter.next()], batchiter))
 
 
-class LocalizedEnum(Enum):
+class LocalizedEnum(FrozenEnum):
     @property
     def lang_id(self):
         raise NotImplementedError()
@@ -11,11 +11,18 @@ def file_transfer_progress():
     return XbmcFileTransferProgress()
 
 
+@singleton
+def metrics():
+    from util.metrics import Metrics
+
+    return Metrics()
+
+
 @singleton
 def http_client():
     from util.httpclient import HttpClient
 
-    return HttpClient(progress=file_transfer_progress())
+    return HttpClient(progress=file_transfer_progress(), metrics=metrics())
 
 
 def details_cache():
@@ -26,21 +33,87 @@ def folders_cache():
     return plugin.get_storage('folders_cache.db', ttl=60 * 12)
 
 
+def files_cache():
+    return plugin.get_storage('files_cache.db', ttl=60 * 12)
+
+
 def search_cache():
     return plugin.get_storage('search_cache.db', ttl=60)
 
 
+# Upper bound of the adaptive concurrency limit, and so of the scraper threads with it
+ADAPTIVE_CONCURRENCY_MAX = 20
+
+
+@singleton
+def concurrency_limiter():
+    from util.aimd import AdaptiveLimiter
+
+    if not plugin.get_setting('adaptive-concurrency', bool):
+        return None
+    # starts from the configured number of simultaneous fetches (or the limit learned before)
+    return AdaptiveLimiter(limit=plugin.get_setting('batch-results', int),
+                           max_limit=ADAPTIVE_CONCURRENCY_MAX,
+                           state=plugin.get_storage('scraper_state.db'),
+                           metrics=metrics())
+
+
+@singleton
+def rate_limiter():
+    from util.ratelimit import FileTokenBucket
+
+    rate = plugin.get_setting('rate-limit', int)
+    if not rate:
+        return None
+    return FileTokenBucket(plugin.addon_data_path('rate_limit'),
+                           rate=rate,
+                           burst=plugin.get_setting('rate-burst', int),
+                           metrics=metrics())
+
+
+def scraper_workers():
+    limiter = concurrency_limiter()
+    return limiter.max_limit if limiter else plugin.get_setting('batch-results', int)
+
+
+def fetch_batch_size():
+    """
+    Number of items to fetch at once, follows the adaptive concurrency limit if enabled
+    """
+    limiter = concurrency_limiter()
+    return int(limiter.limit) if limiter else plugin.get_setting('batch-results', int)
+
+
+@singleton
+def hedger():
+    from util.hedging import Hedger
+
+    percentile = plugin.get_setting('hedge-percentile', int)
+    if not percentile:
+        return None
+    return Hedger(percentile=percentile, max_extra=0.1, max_workers=scraper_workers() * 2, metrics=metrics())
+
+
 @singleton
 def scraper():
     from mediapoisk.scraper import MediaPoiskScraper
+    from util.httpclient import RetryPolicy
 
     return MediaPoiskScraper(http_client=http_client(),
-                             http_params={'tries': 5},
-                             max_workers=plugin.get_setting('batch-results', int),
+                             http_params={'retry_policy': RetryPolicy(tries=5, base_delay=0.5, max_delay=8,
+                                                                      budget=20)},
+                             max_workers=scraper_workers(),
                              details_cache=details_cache(),
                              folders_cache=folders_cache(),
                              search_cache=search_cache(),
                              persistent_ids=not_refreshing_items(),
+                             metrics=metrics(),
+                             lazy_files=plugin.get_setting('lazy-files', bool),
+                             files_cache=files_cache(),
+                             hedger=hedger(),
+                             limiter=concurrency_limiter(),
+                             rate_limiter=rate_limiter(),
+                             search_window=plugin.get_setting('search-window', int),
                              timeout=30)
 
 
@@ -95,7 +168,8 @@ def acestream_engine():
 
     return acestream.Engine(host=plugin.get_setting('as-host', unicode),
                             port=plugin.get_setting('as-port', int, default=62062),
-                            save_path=temp_path() if plugin.get_setting('save-files', int) else None)
+                            save_path=temp_path() if plugin.get_setting('save-files', int) else None,
+                            keep_alive=plugin.get_setting('as-keep-alive', int) > 0)
 
 
 @singleton
@@ -118,37 +192,72 @@ def ace_stream():
 
     return AceStream(engine=acestream_engine(),
                      buffering_progress=stream_buffering_progress(),
-                     playing_progress=stream_playing_progress())
+                     playing_progress=stream_playing_progress(),
+                     session_file=plugin.addon_data_path('as_session'))
 
 
-@singleton
-def torrent2http_engine():
+T2H_BIND_HOST = '127.0.0.1'
+T2H_BIND_PORT = 5001
+
+
+def new_torrent2http_engine(**kwargs):
     import torrent2http
     from mediapoisk.common import temp_path
 
-    return torrent2http.Engine(download_path=temp_path(),
-                               state_file=plugin.addon_data_path('t2h_state'),
-                               connections_limit=plugin.get_setting('t2h-max-connections', int, default=None),
-                               download_kbps=plugin.get_setting('t2h-download-rate', int, default=None),
-                               upload_kbps=plugin.get_setting('t2h-upload-rate', int, default=None),
-                               log_overall_progress=plugin.get_setting('t2h-debug-mode', bool),
-                               log_pieces_progress=plugin.get_setting('t2h-debug-mode', bool),
-                               debug_alerts=plugin.get_setting('t2h-debug-mode', bool),
-                               listen_port=plugin.get_setting('t2h-listen-port', int, default=6881),
-                               use_random_port=plugin.get_setting('t2h-use-random-port', bool),
-                               trackers=['http://retracker.local/announce'],
-                               keep_files=True,
-                               enable_utp=False)
+    params = dict(download_path=temp_path(),
+                  state_file=plugin.addon_data_path('t2h_state'),
+                  connections_limit=plugin.get_setting('t2h-max-connections', int, default=None),
+                  download_kbps=plugin.get_setting('t2h-download-rate', int, default=None),
+                  upload_kbps=plugin.get_setting('t2h-upload-rate', int, default=None),
+                  log_overall_progress=plugin.get_setting('t2h-debug-mode', bool),
+                  log_pieces_progress=plugin.get_setting('t2h-debug-mode', bool),
+                  debug_alerts=plugin.get_setting('t2h-debug-mode', bool),
+                  listen_port=plugin.get_setting('t2h-listen-port', int, default=6881),
+                  use_random_port=plugin.get_setting('t2h-use-random-port', bool),
+                  bind_host=T2H_BIND_HOST,
+                  bind_port=T2H_BIND_PORT,
+                  trackers=['http://retracker.local/announce'],
+                  keep_files=True,
+                  enable_utp=False)
+    params.update(kwargs)
+    return torrent2http.Engine(**params)
+
+
+@singleton
+def torrent2http_engine():
+    return new_torrent2http_engine()
+
+
+@singleton
+def torrent2http_prefetch_engine():
+    # Runs simultaneously with the main engine, so it shouldn't share ports and DHT state with it
+    import socket
+    from contextlib import closing
+
+    bind_port = T2H_BIND_PORT
+    while bind_port == T2H_BIND_PORT:
+        # any free port other than the one of the main engine
+        with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+            s.bind((T2H_BIND_HOST, 0))
+            bind_port = s.getsockname()[1]
+    return new_torrent2http_engine(state_file=plugin.addon_data_path('t2h_prefetch_state'),
+                                   use_random_port=True,
+                                   bind_port=bind_port)
 
 
 @singleton
 def torrent2http_stream():
     from mediapoisk.torrent.stream import Torrent2HttpStream
 
+    prefetch_percent = plugin.get_setting('t2h-prefetch-percent', int)
     return Torrent2HttpStream(engine=torrent2http_engine(),
                               buffering_progress=stream_buffering_progress(),
                               playing_progress=stream_playing_progress(),
-                              pre_buffer_bytes=plugin.get_setting('t2h-pre-buffer-mb', int) * 1024 * 1024)
+                              pre_buffer_bytes=plugin.get_setting('t2h-pre-buffer-mb', int) * 1024 * 1024,
+                              pre_buffer_tail_bytes=plugin.get_setting('t2h-pre-buffer-tail-mb', int) * 1024 * 1024,
+                              prefetch_engine=torrent2http_prefetch_engine() if prefetch_percent else None,
+                              prefetch_percent=prefetch_percent,
+                              prefetch_marker_path=plugin.addon_data_path('t2h_prefetched'))
 
 
 @singleton
@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
-from mediapoisk.common import LocalizedEnum
-from copy import copy
+from mediapoisk.common import LocalizedEnum, lang
+from util.frozenenum import FrozenEnumMeta
 
 try:
     from collections import OrderedDict
@@ -10,7 +10,27 @@ except ImportError:
     from util.ordereddict import OrderedDict
 
 
+class AttributeMeta(FrozenEnumMeta):
+    """
+    Builds reverse lookup index for Attribute.find once the members are created
+    """
+    def __new__(metacls, cls, bases, classdict):
+        enum_class = super(AttributeMeta, metacls).__new__(metacls, cls, bases, classdict)
+        index = {}
+        for member in enum_class:
+            for key in member.value + (member.name,):
+                try:
+                    index.setdefault(key, member)
+                except TypeError:
+                    pass
+        enum_class._find_index = index
+        enum_class._find_misses = set()
+        return enum_class
+
+
 class Attribute(LocalizedEnum):
+    __metaclass__ = AttributeMeta
+
     def get_lang_base(self):
         raise NotImplementedError()
 
@@ -31,9 +51,20 @@ class Attribute(LocalizedEnum):
 
     @classmethod
     def find(cls, what):
+        try:
+            member = cls._find_index.get(what)
+            if member is not None or what in cls._find_misses:
+                return member
+        except TypeError:
+            # unhashable, fall back to linear scan
+            pass
         for i in cls.__iter__():
             if what in i.value or i.name == what:
                 return i
+        try:
+            cls._find_misses.add(what)
+        except TypeError:
+            pass
         return None
 
     @classmethod
@@ -67,18 +98,12 @@ class Section(Attribute):
     SERIES = (20, 'series', 'Series')
     ANIME = (30, 'anime', 'Anime')
 
-    # noinspection PyUnusedLocal
-    def __init__(self, *args):
-        self.lang_base = 31000
-
     def get_lang_base(self):
-        return self.lang_base
+        return 31000
 
     @property
     def singular(self):
-        c = copy(self)
-        c.lang_base = 31040
-        return c
+        return SingularSection(self)
 
     @property
     def folder_name(self):
@@ -88,6 +113,32 @@ class Section(Attribute):
         return self in [Section.SERIES, Section.ANIME]
 
 
+class SingularSection(object):
+    """
+    Section localized in singular form, other attributes are the section's ones
+    """
+
+    def __init__(self, section):
+        self.section = section
+
+    @property
+    def lang_id(self):
+        return 31040 + self.section.id
+
+    @property
+    def localized(self):
+        return lang(self.lang_id)
+
+    def __getattr__(self, name):
+        return getattr(self.section, name)
+
+    def __str__(self):
+        return self.localized
+
+    def __unicode__(self):
+        return self.localized
+
+
 class Format(Attribute):
     AVI = (10, "AVI")
     HD = (20, "HD-rip")
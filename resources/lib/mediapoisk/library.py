@@ -138,6 +138,8 @@ def update_library():
                         if media_id in all_folders:
                             for folder in all_folders[media_id]:
                                 if library_manager.has_folder(folder.id):
+                                    if folder.files is None:
+                                        folder = scraper.get_folder_cached(section, media_id, folder.id)
                                     library_manager.update_folder(details, folder)
                     processed += len(ids)
                     progress.update(processed*100/len(media_ids))
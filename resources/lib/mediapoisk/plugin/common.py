@@ -1,12 +1,10 @@
 # -*- coding: utf-8 -*-
+import time
 import random
 from mediapoisk import container as container
-from mediapoisk.common import filter_dict, date_to_str
+from mediapoisk.common import filter_dict, date_to_str, lang
 from mediapoisk.enumerations import Section
 from mediapoisk.plugin import plugin
-from mediapoisk.plugin.contextmenu import search_result_context_menu, toggle_watched_context_menu, \
-    refresh_context_menu, download_torrent_context_menu, library_context_menu, toggle_auto_refresh_context_menu
-from mediapoisk.scraper import Details, Media, Folder, File
 import titleformat as tf
 
 
@@ -23,10 +21,41 @@ def with_fanart(item, url=None):
         return item
 
 
+class ListDeadline:
+    """
+    Time bound of fetching the items of a list view, shared by all its bulk calls
+    """
+
+    def __init__(self, seconds=None):
+        if seconds is None:
+            seconds = plugin.get_setting('bulk-deadline', int)
+        self.end = time.time() + seconds if seconds else None
+
+    def left(self):
+        """
+        Time left to wait for list items, in seconds, or None if not limited
+        """
+        return max(0, self.end - time.time()) if self.end is not None else None
+
+
+def itemify_placeholder(section, media_id, label=None):
+    """
+    Item for media not fetched in time, it will be shown completely after refresh
+    """
+    from mediapoisk.plugin.contextmenu import refresh_context_menu
+    item = {
+        'label': label or lang(34013) % media_id,
+        'path': plugin.url_for('show_folders', section=section.filter_val, media_id=media_id),
+        'context_menu': refresh_context_menu(media_id),
+    }
+    return with_fanart(item)
+
+
 def itemify_library_folder(d, f):
     """
     :type f: Folder
     """
+    from mediapoisk.plugin.contextmenu import toggle_auto_refresh_context_menu
     item = itemify_folder(f)
     item['label'] = tf.library_folder_title(d, f)
     item['info']['title'] = d.title
@@ -39,6 +68,7 @@ def itemify_folder(f):
     :type f: Folder
     :rtype: dict
     """
+    from mediapoisk.plugin.contextmenu import refresh_context_menu, download_torrent_context_menu, library_context_menu
     item = {
         'label': tf.folder_title(f),
         'path': plugin.url_for('show_files', section=f.section.filter_val, media_id=f.media_id, folder_id=f.id),
@@ -63,6 +93,7 @@ def itemify_file(f, **kwargs):
     """
     :type f: File
     """
+    from mediapoisk.plugin.contextmenu import refresh_context_menu, download_torrent_context_menu, toggle_watched_context_menu
     item = {
         'label': tf.file_title(f),
         'context_menu':
@@ -112,6 +143,7 @@ def itemify_single_result(result, folders=None):
     """
     :type result: Details
     """
+    from mediapoisk.plugin.contextmenu import search_result_context_menu
     media_id = result.media_id
     scraper = container.scraper()
     folders = folders or scraper.get_folders_cached(media_id)
@@ -136,25 +168,64 @@ def itemify_single_result(result, folders=None):
     return item
 
 
-def itemify_search_results(section, results):
+def itemify_media(media):
+    """
+    Item built from the search result row only, for media which details are not fetched yet
+
+    :type media: Media
+    :rtype: dict
+    """
+    from mediapoisk.plugin.contextmenu import media_context_menu
+    item = {
+        'label': tf.media_title(media),
+        'label2': date_to_str(media.date),
+        'path': plugin.url_for('show_folders', section=media.section.filter_val, media_id=media.id),
+        'context_menu': media_context_menu(media.section, media.id, media.title, media.date),
+        'info': filter_dict({
+            'title': media.title,
+            'rating': media.rating,
+            'genre': u" / ".join(unicode(g) for g in media.genres),
+            'country': u" / ".join(unicode(c) for c in media.countries),
+            'year': media.year,
+            'originaltitle': u" / ".join(media.original_title),
+            'date': date_to_str(media.date),
+        }),
+    }
+    return with_fanart(item)
+
+
+def itemify_search_results(section, results, deadline=None):
     """
     :type results: list[Media]
+    :type deadline: ListDeadline
     """
+    from mediapoisk.plugin.contextmenu import search_result_context_menu
     ids = [result.id for result in results]
     scraper = container.scraper()
     meta_cache = container.meta_cache()
-    all_details = scraper.get_details_bulk(section, ids)
+    if plugin.get_setting('fast-lists', bool):
+        # only cached details are used, the rest are fetched after the listing on a best-effort basis
+        # (for at most PENDING_FETCHES_TIMEOUT seconds, see addon.py) to be cached for the next time
+        deadline = 0
+    else:
+        deadline = (deadline or ListDeadline()).left()
+    all_details = scraper.get_details_bulk(section, ids, deadline=deadline)
     watched_items = container.watched_items()
     items = []
     for media in results:
-        details = all_details[media.id]
-        is_series = details.section.is_series()
+        details = all_details.get(media.id)
+        is_series = media.section.is_series()
         watched = watched_items.is_watched(media.id, date_added=media.date if is_series else None)
         meta = meta_cache.setdefault(media.id, {})
         meta.update({
             'date_added': media.date,
             'is_series': is_series,
         })
+        if details is None:
+            item = itemify_media(media)
+            item['info']['playcount'] = int(watched)
+            items.append(item)
+            continue
         item = itemify_details(details)
         item.update({
             'label': tf.media_title(media),
@@ -169,14 +240,21 @@ def itemify_search_results(section, results):
     return items
 
 
-def itemify_bookmarks(bookmarks):
+def itemify_bookmarks(bookmarks, deadline=None):
+    """
+    :type deadline: ListDeadline
+    """
     scraper = container.scraper()
+    deadline = deadline or ListDeadline()
     by_section = {}
     for b in bookmarks:
         by_section.setdefault(b.section, []).append(b.media_id)
     details = {}
     folders = {}
     for section, ids in by_section.iteritems():
-        details[section] = scraper.get_details_bulk(section, ids)
-        folders[section] = scraper.get_folders_bulk(section, ids)
-    return [itemify_single_result(details[b.section][b.media_id], folders[b.section][b.media_id]) for b in bookmarks]
+        details[section] = scraper.get_details_bulk(section, ids, deadline=deadline.left())
+        folders[section] = scraper.get_folders_bulk(section, ids, deadline=deadline.left())
+    return [itemify_single_result(details[b.section][b.media_id], folders[b.section][b.media_id])
+            if b.media_id in details[b.section] and b.media_id in folders[b.section]
+            else itemify_placeholder(b.section, b.media_id)
+            for b in bookmarks]
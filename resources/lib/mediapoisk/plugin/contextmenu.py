@@ -2,12 +2,18 @@
 from mediapoisk import container as container
 from mediapoisk.enumerations import Section
 from mediapoisk.plugin import plugin
-from mediapoisk.common import lang, save_path
+from mediapoisk.common import lang, save_path, notify
 from util.encoding import ensure_str
-from mediapoisk.torrent.client import *
 from xbmcswift2 import actions, xbmcgui, xbmc
 
 
+def folder_ids(media_id):
+    """
+    IDs of the cached folders of the media
+    """
+    return [f.id for f in container.folders_cache().get(media_id, [])]
+
+
 @plugin.route('/mark/watched/<section>/<media_id>')
 def mark_watched(section, media_id):
     meta_cache = container.meta_cache()
@@ -30,6 +36,7 @@ def mark_watched(section, media_id):
 def refresh_all():
     container.details_cache().clear()
     container.folders_cache().clear()
+    container.files_cache().clear()
     container.meta_cache().clear()
     container.search_cache().clear()
     plugin.refresh()
@@ -46,6 +53,10 @@ def turn_on_auto_refresh(section, media_id):
         container.folders_cache().unprotect_item(media_id)
     except KeyError:
         pass
+    files_cache = container.files_cache()
+    for folder_id in folder_ids(media_id):
+        if folder_id in files_cache:
+            files_cache.unprotect_item(folder_id)
     not_refreshing_items = container.not_refreshing_items()
     if media_id in not_refreshing_items:
         del not_refreshing_items[media_id]
@@ -60,6 +71,10 @@ def turn_off_auto_refresh(section, media_id):
     scraper.get_folders_cached(section, media_id)
     container.details_cache().protect_item(media_id)
     container.folders_cache().protect_item(media_id)
+    files_cache = container.files_cache()
+    for folder_id in folder_ids(media_id):
+        if folder_id in files_cache:
+            files_cache.protect_item(folder_id)
     not_refreshing_items = container.not_refreshing_items()
     not_refreshing_items[media_id] = True
     plugin.refresh()
@@ -77,8 +92,12 @@ def refresh(media_id):
     details_cache = container.details_cache()
     folders_cache = container.folders_cache()
     meta_cache = container.meta_cache()
+    files_cache = container.files_cache()
     if media_id in details_cache:
         del(details_cache[media_id])
+    for folder_id in folder_ids(media_id):
+        if folder_id in files_cache:
+            del(files_cache[folder_id])
     if media_id in folders_cache:
         del(folders_cache[media_id])
     if media_id in meta_cache:
@@ -177,17 +196,22 @@ def search_result_context_menu(details, date_added=None, total_size=None):
     """
     :type details: Details
     """
-    media_id = details.media_id
+    return media_context_menu(details.section, details.media_id, details.title, date_added, total_size)
+
+
+def media_context_menu(section, media_id, title, date_added=None, total_size=None):
     return info_context_menu() + \
         refresh_all_context_menu() + \
         refresh_context_menu(media_id) + \
-        toggle_auto_refresh_context_menu(details.section, media_id) + \
-        mark_watched_context_menu(details.section, media_id, date_added, total_size) + \
-        bookmark_context_menu(media_id, details.section, details.title)
+        toggle_auto_refresh_context_menu(section, media_id) + \
+        mark_watched_context_menu(section, media_id, date_added, total_size) + \
+        bookmark_context_menu(media_id, section, title) + \
+        download_all_torrents_context_menu(section, media_id)
 
 
 @plugin.route('/download/<url>')
 def download_torrent(url):
+    from mediapoisk.torrent.client import TransmissionClient, UTorrentClient
     client = container.torrent_client()
     client.add(container.torrent(url), save_path(local=True))
     if isinstance(client, TransmissionClient):
@@ -203,6 +227,34 @@ def download_torrent(url):
         xbmc.executebuiltin('XBMC.RunAddon(%s)' % addon_id)
 
 
+@plugin.route('/download_all/<section>/<media_id>')
+def download_all_torrents(section, media_id):
+    section = Section.find(section)
+    scraper = container.scraper()
+    folders = scraper.get_folders_cached(section, media_id)
+    links = [f.link for f in folders if f.link]
+    if not links:
+        return
+    from mediapoisk.torrent import TorrentClientError, TorrentError
+    client = container.torrent_client()
+    try:
+        client.add_many([container.torrent(link) for link in links], save_path(local=True))
+    except (TorrentClientError, TorrentError) as e:
+        e.log()
+        notify(e.localized)
+        return
+    notify(lang(40326) % len(links))
+
+
+def download_all_torrents_context_menu(section, media_id):
+    if container.torrent_client() and section.is_series():
+        return [(lang(40325), actions.background(plugin.url_for('download_all_torrents',
+                                                                section=section.filter_val,
+                                                                media_id=media_id)))]
+    else:
+        return []
+
+
 def download_torrent_context_menu(url):
     if container.torrent_client() and url:
         return [(lang(40314), actions.background(plugin.url_for('download_torrent', url=url)))]
@@ -3,11 +3,8 @@
 from mediapoisk.plugin import plugin
 from mediapoisk.common import lang, batch, abort_requested, save_files, purge_temp_dir, log
 from mediapoisk.plugin.common import with_fanart, itemify_file, itemify_folder, \
-    itemify_details, itemify_bookmarks, itemify_library_folder
+    itemify_details, itemify_bookmarks, itemify_library_folder, itemify_placeholder, ListDeadline
 from mediapoisk.enumerations import Section, Genre
-from mediapoisk.plugin.search import make_search
-from mediapoisk.plugin.contextmenu import toggle_watched_context_menu, bookmark_context_menu, \
-    download_torrent_context_menu, clear_history_context_menu, library_context_menu
 from util.encoding import ensure_unicode
 
 import titleformat as tf
@@ -29,6 +26,11 @@ def play_file(section, media_id, url, title):
     history.add(media_id, details.section, title, plugin.request.url, url, details.poster)
     history.storage.sync()
     torrent = container.torrent(url=url)
+    next_torrent = None
+    if section.is_series() and getattr(stream, 'prefetch_engine', None):
+        next_file = scraper.get_next_file_cached(section, media_id, url)
+        if next_file:
+            next_torrent = container.torrent(url=next_file.link)
     player = container.player()
 
     def check_and_mark_watched(event):
@@ -39,7 +41,7 @@ def play_file(section, media_id, url, title):
                                total_size=meta.get('total_size'))
 
     player.attach([player.PLAYBACK_STOPPED, player.PLAYBACK_ENDED], check_and_mark_watched)
-    temp_files = stream.play(player, torrent, item)
+    temp_files = stream.play(player, torrent, item, next_torrent=next_torrent)
     if temp_files:
         save_files(temp_files, rename=not stream.saved_files_needed, on_finish=purge_temp_dir)
     else:
@@ -58,6 +60,7 @@ def show_files(section, media_id, folder_id):
 
 @plugin.route('/folders/<section>/<media_id>')
 def show_folders(section, media_id):
+    from mediapoisk.plugin.contextmenu import library_context_menu
     section = Section.find(section)
     scraper = container.scraper()
     meta_cache = container.meta_cache()
@@ -67,7 +70,7 @@ def show_folders(section, media_id):
     total_size = sum(f.size for f in folders)
     meta['total_size'] = total_size
     for f in folders:
-        if len(f.files) == 1 and not meta.get('is_series'):
+        if f.files is not None and len(f.files) == 1 and not meta.get('is_series'):
             item = itemify_file(f.files[0], can_mark_watched=1)
             item['label'] = tf.folder_file_title(f, f.files[0])
             item['context_menu'] += library_context_menu(section, media_id, f.id)
@@ -79,6 +82,7 @@ def show_folders(section, media_id):
 
 @plugin.route('/explore/<section>')
 def explore(section):
+    from mediapoisk.plugin.search import make_search
     plugin.set_content('movies')
     section = Section.find(section)
     sf = container.search_filter(section)
@@ -101,6 +105,7 @@ def genre_index(section):
 
 @plugin.route('/genre/<section>/<genre>')
 def by_genre(section, genre):
+    from mediapoisk.plugin.search import make_search
     plugin.set_content('movies')
     section = Section.find(section)
     genre = Genre.find(genre) or unicode(genre)
@@ -115,10 +120,11 @@ def bookmarks_index(section):
     section = Section.find(section)
     bookmarks = container.bookmarks().get(section)
     total = len(bookmarks)
+    deadline = ListDeadline()
     for b in batch(reversed(bookmarks)):
         if abort_requested():
             break
-        items = itemify_bookmarks(b)
+        items = itemify_bookmarks(b, deadline)
         plugin.add_items(items, total)
     plugin.finish(sort_methods=['unsorted', 'title', 'video_year', 'video_rating'], cache_to_disc=False)
 
@@ -133,6 +139,8 @@ def clear_history():
 @plugin.route('/history', options={'section': None}, name='global_history')
 @plugin.route('/history/<section>')
 def history_index(section):
+    from mediapoisk.plugin.contextmenu import toggle_watched_context_menu, bookmark_context_menu, \
+        download_torrent_context_menu, clear_history_context_menu
     plugin.set_content('movies')
     section = Section.find(section)
     history = container.history()
@@ -156,15 +164,18 @@ def history_index(section):
 def library_items():
     scraper = container.scraper()
     library_manager = container.library_manager()
+    deadline = ListDeadline()
     for section, media_ids in library_manager.stored_media_ids().items():
         for ids in batch(media_ids):
             if abort_requested():
                 break
-            all_folders = scraper.get_folders_bulk(section, ids)
-            all_details = scraper.get_details_bulk(section, ids)
+            all_folders = scraper.get_folders_bulk(section, ids, deadline=deadline.left())
+            all_details = scraper.get_details_bulk(section, ids, deadline=deadline.left())
             items = [itemify_library_folder(all_details[media_id], f)
-                     for media_id, folders in all_folders.iteritems()
+                     for media_id, folders in all_folders.iteritems() if media_id in all_details
                      for f in folders if library_manager.has_folder(f.id)]
+            items += [itemify_placeholder(section, media_id) for media_id in ids
+                      if media_id not in all_folders or media_id not in all_details]
             plugin.add_items(items)
     plugin.finish(sort_methods=['title'], cache_to_disc=False)
 
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+Route table of the plugin views.
+
+Routes are declared up front so that a plugin call imports only the module of the
+dispatched view (and its dependencies). The route decorators in the view modules
+bind the actual functions once a module is loaded; keep both in sync.
+"""
+
+from mediapoisk.plugin import plugin
+
+ROUTES = [
+    # url_rule, module, function, name, options
+    ('/mark/watched/<section>/<media_id>', 'contextmenu', 'mark_watched', None, None),
+    ('/refresh', 'contextmenu', 'refresh_all', None, None),
+    ('/turn_on_auto_refresh/<section>/<media_id>', 'contextmenu', 'turn_on_auto_refresh', None, None),
+    ('/turn_off_auto_refresh/<section>/<media_id>', 'contextmenu', 'turn_off_auto_refresh', None, None),
+    ('/mark/unwatched/<media_id>', 'contextmenu', 'mark_unwatched', None, None),
+    ('/refresh/<media_id>', 'contextmenu', 'refresh', None, None),
+    ('/bookmarks/<section>/add/<media_id>/<title>', 'contextmenu', 'add_bookmark', None, None),
+    ('/bookmarks/delete/<media_id>', 'contextmenu', 'delete_bookmark', None, None),
+    ('/library/add/<section>/<media_id>/<folder_id>', 'contextmenu', 'add_to_library', None, None),
+    ('/library/remove/<folder_id>', 'contextmenu', 'remove_from_library', None, None),
+    ('/download/<url>', 'contextmenu', 'download_torrent', None, None),
+    ('/download_all/<section>/<media_id>', 'contextmenu', 'download_all_torrents', None, None),
+
+    ('/search/clear', 'search', 'clear_search_history', None, None),
+    ('/search/delete/<name>', 'search', 'delete_search', None, None),
+    ('/search/<section>/new', 'search', 'new_search', None, None),
+    ('/search/<section>/do/<name>', 'search', 'do_search', None, None),
+    ('/search/<section>', 'search', 'search_index', None, None),
+    ('/global_search/new', 'search', 'new_global_search', None, None),
+    ('/global_search/do/<name>', 'search', 'do_global_search', None, None),
+
+    ('/play/<section>/<media_id>/<url>/<title>', 'main', 'play_file', None, None),
+    ('/files/<section>/<media_id>/<folder_id>', 'main', 'show_files', None, None),
+    ('/folders/<section>/<media_id>', 'main', 'show_folders', None, None),
+    ('/explore/<section>', 'main', 'explore', None, None),
+    ('/genre/<section>', 'main', 'genre_index', None, None),
+    ('/genre/<section>/<genre>', 'main', 'by_genre', None, None),
+    ('/bookmarks/<section>', 'main', 'bookmarks_index', None, None),
+    ('/bookmarks', 'main', 'bookmarks_index', 'global_bookmarks', {'section': None}),
+    ('/history/clear', 'main', 'clear_history', None, None),
+    ('/history/<section>', 'main', 'history_index', None, None),
+    ('/history', 'main', 'history_index', 'global_history', {'section': None}),
+    ('/library', 'main', 'library_items', None, None),
+    ('/', 'main', 'index', None, None),
+    ('/update_library', 'main', 'library_update', None, None),
+
+    ('/advanced_search/clear', 'advancedsearch', 'clear_advanced_search', None, None),
+    ('/advanced_search/<section>/do', 'advancedsearch', 'do_advanced_search', None, None),
+    ('/advanced_search/edit/<param>', 'advancedsearch', 'edit_advanced_search', None, None),
+    ('/advanced_search/<section>', 'advancedsearch', 'advanced_search', None, None),
+]
+
+for url_rule, module, func_name, name, options in ROUTES:
+    plugin.add_lazy_url_rule(url_rule, 'mediapoisk.plugin.' + module, func_name, name=name, options=options)
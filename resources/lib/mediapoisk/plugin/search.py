@@ -3,11 +3,12 @@ from mediapoisk import container as container
 from mediapoisk.common import lang, batch, abort_requested, notify
 from mediapoisk.enumerations import Section
 from mediapoisk.plugin import plugin
-from mediapoisk.plugin.common import with_fanart, itemify_search_results, itemify_single_result
-from mediapoisk.scraper import Details
+from mediapoisk.plugin.common import with_fanart, itemify_search_results, itemify_single_result, ListDeadline
 from util.encoding import ensure_unicode
 from xbmcswift2 import actions
 
+import titleformat as tf
+
 
 @plugin.route('/search/clear')
 def clear_search_history():
@@ -26,19 +27,77 @@ def delete_search(name):
     plugin.refresh()
 
 
-@plugin.route('/search/<section>/new')
-def new_search(section):
+def ask_search_term():
     storage = container.search_storage()
     if 'search_term' in storage:
-        value = storage['search_term']
-    else:
-        value = plugin.keyboard(heading=lang(40310))
-        if not value:
-            return
+        return storage['search_term']
+    value = plugin.keyboard(heading=lang(40310))
+    if value:
         storage['search_term'] = value
+    return value
+
+
+@plugin.route('/search/<section>/new')
+def new_search(section):
+    value = ask_search_term()
+    if not value:
+        return
     plugin.redirect(plugin.url_for('do_search', section=section, name=value, new=True))
 
 
+@plugin.route('/global_search/new')
+def new_global_search():
+    value = ask_search_term()
+    if not value:
+        return
+    plugin.redirect(plugin.url_for('do_global_search', name=value, new=True))
+
+
+def add_recent_search(name):
+    storage = container.search_storage()
+    recent = storage.get('search_recent', [])
+    if name in recent:
+        recent.remove(name)
+    recent.append(name)
+    storage['search_recent'] = recent
+    count = plugin.get_setting('search-items-count', int)
+    if len(recent) > count:
+        del recent[:len(recent)-count]
+
+
+@plugin.route('/global_search/do/<name>')
+def do_global_search(name):
+    plugin.set_content('movies')
+    scraper = container.scraper()
+    search_filters = [container.search_filter(section=s, name=str(name)) for s in Section]
+    found_ids = set()
+    deadline = ListDeadline()
+    # sections are searched in parallel and itemified as their searches are completed,
+    # the listing is shown when all of them are done (or the scraper timeout is exceeded)
+    for sf, results in scraper.search_bulk(search_filters):
+        if abort_requested():
+            break
+        results = [r for r in results if r.id not in found_ids]
+        if not results:
+            continue
+        found_ids.update(r.id for r in results)
+        plugin.add_items(with_fanart([{
+            'label': tf.decorate(sf.section.localized, bold=True, color='white'),
+            'path': plugin.url_for('do_search', section=sf.section.filter_val, name=name),
+        }]))
+        for batch_res in batch(results):
+            if abort_requested():
+                break
+            plugin.add_items(itemify_search_results(sf.section, batch_res, deadline))
+    if not found_ids:
+        notify(lang(40312) % ensure_unicode(name))
+        return
+    if plugin.request.arg('new'):
+        add_recent_search(name)
+    # results are grouped under section headers, so other sort methods would mix them up
+    plugin.finish(sort_methods=['unsorted'])
+
+
 @plugin.route('/search/<section>/do/<name>')
 def do_search(section, name):
     plugin.set_content('movies')
@@ -47,15 +106,7 @@ def do_search(section, name):
     if not make_search(sf):
         notify(lang(40312) % ensure_unicode(name))
     elif plugin.request.arg('new'):
-        storage = container.search_storage()
-        recent = storage.get('search_recent', [])
-        if name in recent:
-            recent.remove(name)
-        recent.append(name)
-        storage['search_recent'] = recent
-        count = plugin.get_setting('search-items-count', int)
-        if len(recent) > count:
-            del recent[:len(recent)-count]
+        add_recent_search(name)
 
 
 @plugin.route('/search/<section>')
@@ -76,6 +127,11 @@ def search_index(section):
         'path': plugin.url_for('advanced_search', section=section),
         'context_menu': context_menu,
         'replace_context_menu': True,
+    }, {
+        'label': lang(34014),
+        'path': plugin.url_for('new_global_search'),
+        'context_menu': context_menu,
+        'replace_context_menu': True,
     }]
     if 'search_recent' in storage:
         items.extend([{
@@ -90,6 +146,7 @@ def search_index(section):
 
 
 def make_search(sf, header=None, cache_to_disc=False, update_listing=False):
+    from mediapoisk.scraper import Details
     skip = plugin.request.arg('skip')
     scraper = container.scraper()
     results = scraper.search_cached(sf, skip)
@@ -115,10 +172,11 @@ def make_search(sf, header=None, cache_to_disc=False, update_listing=False):
         items.extend(header)
         total += len(header)
     plugin.add_items(with_fanart(items), total)
+    deadline = ListDeadline()
     for batch_res in batch(results):
         if abort_requested():
             break
-        items = itemify_search_results(sf.section, batch_res)
+        items = itemify_search_results(sf.section, batch_res, deadline)
         plugin.add_items(items, total)
     items = []
     if scraper.has_more:
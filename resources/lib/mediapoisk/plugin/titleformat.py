@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
-from mediapoisk.enumerations import Genre, Country
-
-from mediapoisk.scraper import Folder, Flag, File, Media, Details
+from mediapoisk.enumerations import Genre, Country, Flag
 from mediapoisk.common import lang
 from mediapoisk.plugin import plugin
 
@@ -96,12 +94,21 @@ def bookmark_title(details, folders):
            (" [%s]" % ("/".join(unicode(f) for f in formats)) if plugin.get_setting('show-video-quality', bool) else "")
 
 
+def files_count(folder):
+    """
+    :type folder: Folder
+    """
+    if folder.files is None:
+        # files are not loaded yet
+        return ""
+    return " / %d %s" % (len(folder.files), declension_ru(len(folder.files), lang(34005), lang(34006), lang(34007)))
+
+
 def folder_title(folder):
     """
     :type folder: Folder
     """
-    return "%s %s / %d %s" % (flag_label(folder.flag), color(folder.title, 'white'), len(folder.files),
-                              declension_ru(len(folder.files), lang(34005), lang(34006), lang(34007))) + \
+    return "%s %s%s" % (flag_label(folder.flag), color(folder.title, 'white'), files_count(folder)) + \
            (", %s" % unicode(folder.quality.video) if folder.quality.video and plugin.get_setting('show-video-quality', bool) else "") + \
            (", %s" % unicode(folder.quality.audio) if folder.quality.audio and plugin.get_setting('show-audio-quality', bool) else "") + \
            (", %s" % human_size(folder.size) if plugin.get_setting('show-total-size', bool) else "")
@@ -112,9 +119,8 @@ def library_folder_title(details, folder):
     :type details: Details
     :type folder: Folder
     """
-    return "%s %s / %s / %s / %d %s" % (flag_label(folder.flag), color(details.title, 'white'),
-                                        details.section.singular.localized, folder.title, len(folder.files),
-                                        declension_ru(len(folder.files), lang(34005), lang(34006), lang(34007)))
+    return "%s %s / %s / %s%s" % (flag_label(folder.flag), color(details.title, 'white'),
+                                  details.section.singular.localized, folder.title, files_count(folder))
 
 
 def human_size(num, suffix='b'):
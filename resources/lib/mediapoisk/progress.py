@@ -13,10 +13,15 @@ class AbstractTorrentTransferProgress(AbstractFileTransferProgress):
         self.upload_rate = 0
         self.seeds = 0
         self.peers = 0
+        self.ranges = None
 
     def update_status(self, state, bytes_transferred=0, download_rate=0, upload_rate=0,
-                      seeds=0, peers=0, progress=None):
+                      seeds=0, peers=0, progress=None, ranges=None):
+        """
+        :param ranges: List of (transferred, total) byte counts for each pre-buffered range of the file
+        """
         self.state = state
+        self.ranges = ranges
         self.download_rate = download_rate
         self.upload_rate = upload_rate
         self.seeds = seeds
@@ -37,6 +42,10 @@ class AbstractTorrentTransferProgress(AbstractFileTransferProgress):
         else:
             return '%.2f%s/s' % (float(rate_kbps) / float(factor), human)
 
+    @staticmethod
+    def _range_percent(transferred, total):
+        return int(transferred * 100 / total) if total else 100
+
 
 class LoggingTorrentTransferProgress(AbstractTorrentTransferProgress):
     def __init__(self, name=None, size=-1, log=None):
@@ -60,6 +69,9 @@ class LoggingTorrentTransferProgress(AbstractTorrentTransferProgress):
                           self._human_rate(self.download_rate),
                           self._human_rate(self.upload_rate),
                           self.peers, self.seeds)
+            if self.ranges:
+                self.log.info("%s: ranges %s", self.name,
+                              ", ".join("%d%%" % self._range_percent(*r) for r in self.ranges))
         else:
             self.log.info("%s: %s %d%%", self.name, self.state.localized, percent)
 
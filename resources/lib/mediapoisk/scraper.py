@@ -5,16 +5,15 @@ from collections import namedtuple
 from mediapoisk.enumerations import *
 from mediapoisk.common import LocalizedError, str_to_date
 from util.timer import Timer
-from util.htmldocument import HtmlDocument
-from util.httpclient import HttpClient
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
-from mediapoisk.searchfilter import MediaPoiskSearchFilter
 
 import re
+import time
+import itertools
 import urllib
 import urllib2
 import logging
 import socket
+import threading
 
 
 Media = namedtuple('Media', ['id', 'title', 'original_title', 'date', 'flag', 'quality', 'genres',
@@ -37,31 +36,92 @@ class ScraperError(LocalizedError):
     pass
 
 
-class AbstractScraper:
+class AbstractScraper(object):
     def __init__(self, log=None, http_params=None, http_client=None, max_workers=10, timeout=30,
-                 details_cache=None, folders_cache=None, search_cache=None, persistent_ids=None):
+                 details_cache=None, folders_cache=None, search_cache=None, persistent_ids=None,
+                 metrics=None, lazy_files=False, files_cache=None, hedger=None, limiter=None,
+                 rate_limiter=None, background=False, search_window=0):
         self.log = log or logging.getLogger(__name__)
-        self.http_client = http_client or HttpClient()
+        if http_client is None:
+            from util.httpclient import HttpClient
+            http_client = HttpClient()
+        self.http_client = http_client
         self.http_params = http_params or {}
         self.timeout = timeout
         self.details_cache = details_cache if details_cache is not None else {}
         self.folders_cache = folders_cache if folders_cache is not None else {}
         self.search_cache = search_cache if search_cache is not None else {}
+        self.files_cache = files_cache if files_cache is not None else {}
+        self.lazy_files = lazy_files
+        self.executor = None
+        self.pending = []
         self.max_workers = max_workers
         self.persistent_ids = persistent_ids or []
+        self.metrics = metrics
+        self.hedger = hedger
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.background = background
+        self.search_window = search_window
         self.http_response = None
-        self.has_more = False
+        self.local = threading.local()
+
+    @property
+    def has_more(self):
+        """
+        Whether the last search made in the current thread has more results
+        """
+        return getattr(self.local, 'has_more', False)
+
+    @has_more.setter
+    def has_more(self, value):
+        self.local.has_more = value
 
     def fetch_page(self, url, cookie_jar=None):
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.background, max_wait=self.timeout)
+        if self.limiter:
+            self.limiter.acquire()
+        started = time.time()
+        latency = None
+        overloaded = False
         try:
-            self.http_client.cookie_jar = cookie_jar
-            self.http_response = self.http_client.fetch(url, timeout=self.timeout, **self.http_params)
-            return self.http_response.body
+            if self.hedger:
+                # slow requests are duplicated
+                response = self.hedger.call(self._hedged_fetch(), url, timeout=self.timeout,
+                                            cookie_jar=cookie_jar, **self.http_params)
+            else:
+                response = self.http_client.fetch(url, timeout=self.timeout, cookie_jar=cookie_jar,
+                                                  **self.http_params)
+            self.http_response = response
+            latency = time.time() - started
+            return response.body
         except urllib2.URLError, e:
             if isinstance(e.reason, socket.timeout):
+                overloaded = True
                 raise ScraperError(32000, "Timeout while fetching URL: %s" % url, cause=e)
             else:
+                overloaded = getattr(e, 'code', 0) >= 500
                 raise ScraperError(32001, "Can't fetch URL: %s" % url, cause=e)
+        finally:
+            if self.limiter:
+                self.limiter.release(latency, overloaded)
+
+    def _hedged_fetch(self):
+        """
+        HTTP client fetch which charges the duplicate (hedged) requests to the rate limiter as well
+        """
+        calls = itertools.count()
+
+        def fetch(*args, **kwargs):
+            if next(calls) and self.rate_limiter:
+                self.rate_limiter.acquire(self.background, max_wait=self.timeout)
+            return self.http_client.fetch(*args, **kwargs)
+        return fetch
+
+    def _cache_access(self, name, hits, misses):
+        if self.metrics is not None:
+            self.metrics.cache_access(name, hits, misses)
 
     def search(self, search_filter=None, skip=None):
         raise NotImplementedError()
@@ -76,14 +136,99 @@ class AbstractScraper:
         raise NotImplementedError()
 
     def search_cached(self, search_filter=None, skip=None):
+        """
+        With search_window, results are fetched in pages of search_window rows, and pages of
+        search_filter.page_size rows are sliced from them (search_window must be a multiple of it).
+        """
+        if self._uses_search_window(search_filter):
+            return self._search_window_cached(search_filter, skip or 0)
+        return self._search_cached(search_filter, skip)
+
+    def search_bulk(self, search_filters):
+        """
+        Search with several filters (first pages only) in parallel, yielding (search_filter, results)
+        as each search is completed, cached ones first. Searches failed or not completed in time
+        are skipped.
+        """
+        from concurrent.futures import as_completed, TimeoutError
+        futures = {}
+        for search_filter in search_filters:
+            request_filter, skip = self._search_request(search_filter)
+            if hash((request_filter, skip)) in self.search_cache:
+                yield search_filter, self.search_cached(search_filter)
+            else:
+                future = self._executor().submit(self._search_with_more, request_filter, skip)
+                futures[future] = search_filter
+        try:
+            for future in as_completed(futures, self.timeout):
+                search_filter = futures[future]
+                request_filter, skip = self._search_request(search_filter)
+                try:
+                    # cached here, as the cache is not thread-safe
+                    self.search_cache[hash((request_filter, skip))] = future.result()
+                except ScraperError as e:
+                    self.log.error("Search failed: %s", e)
+                    continue
+                yield search_filter, self.search_cached(search_filter)
+        except TimeoutError:
+            not_done = [f for f in futures if not f.done()]
+            self.log.error("Timeout while searching, %d search(es) skipped.", len(not_done))
+            for future in not_done:
+                future.cancel()
+
+    def _search_with_more(self, search_filter, skip):
+        return self.search(search_filter, skip), self.has_more
+
+    def _uses_search_window(self, search_filter):
+        page_size = search_filter.page_size if search_filter else None
+        return self.search_window and page_size and self.search_window > page_size and \
+            not self.search_window % page_size
+
+    def _search_request(self, search_filter, skip=None):
+        """
+        Search filter and skip of the request made by search_cached() (unless it falls back
+        to regular pages)
+        """
+        if not self._uses_search_window(search_filter):
+            return search_filter, skip
+        from copy import copy
+        window_filter = copy(search_filter)
+        window_filter.page_size = self.search_window
+        skip = skip or 0
+        return window_filter, skip - skip % self.search_window or None
+
+    def _search_cached(self, search_filter, skip):
         key = hash((search_filter, skip))
-        if key not in self.search_cache:
+        if key in self.search_cache:
+            self._cache_access('search_cache', 1, 0)
+        else:
+            self._cache_access('search_cache', 0, 1)
             self.search_cache[key] = (self.search(search_filter, skip), self.has_more)
         res, self.has_more = self.search_cache[key]
         return res
 
-    def get_details_bulk(self, section, media_ids):
+    def _search_window_cached(self, search_filter, skip):
+        window_filter, window_skip = self._search_request(search_filter, skip)
+        results = self._search_cached(window_filter, window_skip)
+        if not isinstance(results, list):
+            # single result, no paging
+            return results
+        if self.has_more and len(results) < self.search_window:
+            self.log.info("Got %d results instead of %d, not using search window.", len(results), self.search_window)
+            return self._search_cached(search_filter, skip or None)
+        offset = skip - (window_skip or 0)
+        page = results[offset:offset + search_filter.page_size]
+        self.has_more = self.has_more or offset + search_filter.page_size < len(results)
+        return page
+
+    def get_details_bulk(self, section, media_ids, deadline=None):
         """
+        Get details of the media, fetching them in parallel.
+
+        With deadline (in seconds), details not fetched in time are missing in the results; their fetching
+        goes on in background and they are cached by store_pending(). Without deadline, ScraperError is raised
+        if fetching takes longer than the timeout.
+
         :rtype : dict[int, Details]
         """
         if not media_ids:
@@ -91,18 +236,22 @@ class AbstractScraper:
         cached_details = self.details_cache.keys()
         not_cached_ids = [_id for _id in media_ids if _id not in cached_details]
         results = dict((_id, self.details_cache[_id]) for _id in media_ids if _id in cached_details)
-        with Timer(logger=self.log, name="Bulk fetching"):
-            try:
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    futures = [executor.submit(self.get_details, section, _id) for _id in not_cached_ids]
-                    for future in as_completed(futures, self.timeout):
-                        result = future.result()
-                        _id = result.media_id
-                        self.details_cache[_id] = results[_id] = result
-                        if _id in self.persistent_ids:
-                            self.details_cache.protect_item(_id)
-            except TimeoutError as e:
-                raise ScraperError(32000, "Timeout while fetching URLs", cause=e)
+        self._cache_access('details_cache', len(results), len(not_cached_ids))
+        from concurrent.futures import wait
+        with Timer(logger=self.log, metrics=self.metrics, name="Bulk fetching details"):
+            executor = self._executor()
+            futures = dict((executor.submit(self.get_details, section, _id), _id) for _id in not_cached_ids)
+            done, not_done = wait(futures, deadline if deadline is not None else self.timeout)
+            for future in done:
+                _id = futures[future]
+                results[_id] = future.result()
+                self._cache_details(_id, results[_id])
+            if not_done:
+                if deadline is None:
+                    raise ScraperError(32000, "Timeout while fetching URLs")
+                self.log.info("Deadline exceeded, %d details left pending.", len(not_done))
+                for future in not_done:
+                    self._defer(self._cache_details, futures[future], future)
         return results
 
     def get_details_cached(self, section, media_id):
@@ -111,8 +260,13 @@ class AbstractScraper:
         """
         return self.get_details_bulk(section, [media_id])[media_id]
 
-    def get_folders_bulk(self, section, media_ids):
+    def get_folders_bulk(self, section, media_ids, deadline=None):
         """
+        Get folders of the media, fetching them in parallel. With lazy_files, files of the folders not
+        listed on the media page are not fetched (Folder.files is None), use get_files_cached() to get them.
+
+        Deadline works the same way as in get_details_bulk().
+
         :rtype : dict[int, list[Folder]]
         """
         if not media_ids:
@@ -120,35 +274,128 @@ class AbstractScraper:
         cached_folders = self.folders_cache.keys()
         not_cached_ids = [_id for _id in media_ids if _id not in cached_folders]
         results = dict((_id, self.folders_cache[_id]) for _id in media_ids if _id in cached_folders)
-        with Timer(logger=self.log, name="Bulk fetching"):
+        self._cache_access('folders_cache', len(results), len(not_cached_ids))
+        from concurrent.futures import wait, as_completed, TimeoutError
+        started = time.time()
+        with Timer(logger=self.log, metrics=self.metrics, name="Bulk fetching folders"):
+            executor = self._executor()
+            folder_futures = dict((executor.submit(self.get_folders, section, _id), _id) for _id in not_cached_ids)
+            not_done = set(folder_futures)
+            files_futures = {}
             try:
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    folder_futures = dict((executor.submit(self.get_folders, section, _id), _id)
-                                          for _id in not_cached_ids)
-                    files_futures = {}
-                    for future in as_completed(folder_futures, self.timeout):
-                        result = future.result()
-                        _id = folder_futures[future]
-                        results[_id] = result
-                        if len(result) > 1:
-                            files_futures.update(dict((executor.submit(self.get_files, section, _id, f.id), (_id, i))
-                                                      for i, f in enumerate(result)))
-                        else:
-                            self.folders_cache[_id] = result
-                            if _id in self.persistent_ids:
-                                self.folders_cache.protect_item(_id)
-
-                    for future in as_completed(files_futures, self.timeout):
-                        result = future.result()
-                        _id, i = files_futures[future]
-                        results[_id][i].files.extend(result)
-                        self.folders_cache[_id] = results[_id]
-                        if _id in self.persistent_ids:
-                            self.folders_cache.protect_item(_id)
-            except TimeoutError as e:
-                raise ScraperError(32000, "Timeout while fetching URLs", cause=e)
+                # files are fetched as soon as folders of the media are known
+                for future in as_completed(folder_futures, deadline if deadline is not None else self.timeout):
+                    not_done.remove(future)
+                    _id = folder_futures[future]
+                    results[_id] = folders = future.result()
+                    missing = self._missing_files(folders)
+                    if missing:
+                        files_futures.update(dict((executor.submit(self.get_files, section, _id, f.id), (_id, f))
+                                                  for f in missing))
+                    else:
+                        self._cache_folders(_id, folders)
+            except TimeoutError:
+                pass
+
+            files_timeout = max(0, deadline - (time.time() - started)) if deadline is not None else self.timeout
+            files_done, files_not_done = wait(files_futures, files_timeout)
+            for future in files_done:
+                _id, folder = files_futures[future]
+                folder.files.extend(future.result())
+            incomplete = set(files_futures[future][0] for future in files_not_done)
+            for _id in set(_id for _id, folder in files_futures.itervalues()) - incomplete:
+                self._cache_folders(_id, results[_id])
+
+            if not_done or files_not_done:
+                if deadline is None:
+                    raise ScraperError(32000, "Timeout while fetching URLs")
+                self.log.info("Deadline exceeded, folders of %d media left pending.", len(not_done) + len(incomplete))
+                for future in not_done:
+                    self._defer(self._complete_folders, section, folder_futures[future], future)
+                for _id in incomplete:
+                    pending_files = [(f, folder) for f, (i, folder) in files_futures.iteritems()
+                                     if i == _id and f in files_not_done]
+                    self.pending.append((self._complete_files, (_id, results.pop(_id), pending_files),
+                                         [f for f, folder in pending_files]))
         return results
 
+    def _missing_files(self, folders):
+        """
+        Folders which files are not listed on the media page, so they should be fetched from the folder pages
+        """
+        missing = [i for i, f in enumerate(folders) if not f.files] if len(folders) > 1 else []
+        if self.lazy_files:
+            for i in missing:
+                folders[i] = folders[i]._replace(files=None)
+            return []
+        return [folders[i] for i in missing]
+
+    def _cache_details(self, media_id, details):
+        self.details_cache[media_id] = details
+        if media_id in self.persistent_ids:
+            self.details_cache.protect_item(media_id)
+
+    def _cache_folders(self, media_id, folders):
+        self.folders_cache[media_id] = folders
+        if media_id in self.persistent_ids:
+            self.folders_cache.protect_item(media_id)
+
+    def _complete_folders(self, section, media_id, folders):
+        for f in self._missing_files(folders):
+            f.files.extend(self.get_files(section, media_id, f.id))
+        self._cache_folders(media_id, folders)
+
+    def _complete_files(self, media_id, folders, pending_files):
+        for future, folder in pending_files:
+            folder.files.extend(future.result(self.timeout))
+        self._cache_folders(media_id, folders)
+
+    def _executor(self):
+        """
+        Executor is kept between bulk calls, so that fetches left after a deadline can go on
+        """
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _defer(self, func, *args):
+        """
+        Call func when store_pending() is called, with the result of a future given as the last argument
+        """
+        self.pending.append((func, args, [args[-1]]))
+
+    def store_pending(self, timeout=None):
+        """
+        Wait for fetches left running after the deadline of bulk methods and cache their results.
+        Caches are not thread-safe, so it should be called from the thread which made the bulk call,
+        e.g. after the listing is finished.
+
+        Fetches not completed in timeout seconds overall (scraper timeout by default) are cancelled,
+        unless already running, and their results are dropped.
+        """
+        from concurrent.futures import Future, wait
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        timeout = self.timeout if timeout is None else timeout
+        self.log.info("Storing %d pending result(s)...", len(pending))
+        done, not_done = wait([f for func, args, futures in pending for f in futures], timeout)
+        dropped = 0
+        for func, args, futures in pending:
+            if not_done.intersection(futures):
+                dropped += 1
+                continue
+            try:
+                args = [arg.result() if isinstance(arg, Future) else arg for arg in args]
+                func(*args)
+            except Exception as e:
+                self.log.warn("Can't store pending result: %s", e)
+        for future in not_done:
+            future.cancel()
+        if dropped:
+            self.log.info("%d pending result(s) not completed in %.1f seconds, dropped.", dropped, timeout)
+
     def get_folders_cached(self, section, media_id):
         """
         :rtype : list[Folder]
@@ -156,13 +403,48 @@ class AbstractScraper:
         return self.get_folders_bulk(section, [media_id])[media_id]
 
     def get_folder_cached(self, section, media_id, folder_id):
+        """
+        Get folder with its files
+
+        :rtype : Folder
+        """
         folders = self.get_folders_cached(section, media_id)
-        return next((folder for folder in folders if folder.id == folder_id), None)
+        folder = next((folder for folder in folders if folder.id == folder_id), None)
+        if folder and folder.files is None:
+            folder = folder._replace(files=self._get_lazy_files_cached(section, media_id, folder_id))
+        return folder
 
     def get_files_cached(self, section, media_id, folder_id):
         folder = self.get_folder_cached(section, media_id, folder_id)
         return folder and folder.files or []
 
+    def _get_lazy_files_cached(self, section, media_id, folder_id):
+        if folder_id in self.files_cache:
+            self._cache_access('files_cache', 1, 0)
+        else:
+            self._cache_access('files_cache', 0, 1)
+            self.files_cache[folder_id] = self.get_files(section, media_id, folder_id)
+            if media_id in self.persistent_ids:
+                self.files_cache.protect_item(folder_id)
+        return self.files_cache[folder_id]
+
+    def get_next_file_cached(self, section, media_id, link):
+        """
+        Get the file following the one with given link in the same folder
+
+        :rtype : File
+        """
+        for folder in self.get_folders_cached(section, media_id):
+            files = folder.files
+            if files is None:
+                # the file being played was listed with get_files_cached(), so its folder is cached
+                files = self.files_cache.get(folder.id, [])
+            links = [f.link for f in files]
+            if link in links:
+                i = links.index(link)
+                return files[i+1] if i+1 < len(files) else None
+        return None
+
 
 class MediaPoiskScraper(AbstractScraper):
     base_url = "http://mediapoisk.info"
@@ -171,7 +453,7 @@ class MediaPoiskScraper(AbstractScraper):
         """
         Search media
 
-        :type search_filter: MediaPoiskSearchFilter
+        :type search_filter: mediapoisk.searchfilter.MediaPoiskSearchFilter
         :param search_filter: Use SearchFilter
         :param skip: How many results to skip (for paging)
         """
@@ -187,13 +469,14 @@ class MediaPoiskScraper(AbstractScraper):
         if query:
             url += "?" + urllib.urlencode(query)
 
-        with Timer(logger=self.log, name='Fetching URL'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Fetching URL'):
             html = self.fetch_page(url, cookie_jar=cookie_jar)
 
         section = search_filter.section
         results = []
         warnings = 0
-        with Timer(logger=self.log, name='Parsing'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Parsing search results'):
+            from util.htmldocument import HtmlDocument
             document = HtmlDocument.from_string(html)
             self.has_more = False
             table = document.find('table', {'class': 'zebra'})
@@ -296,7 +579,8 @@ class MediaPoiskScraper(AbstractScraper):
     def _parse_details(self, html, section, media_id):
         details = None
         warnings = 0
-        with Timer(logger=self.log, name='Parsing'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Parsing details'):
+            from util.htmldocument import HtmlDocument
             document = HtmlDocument.from_string(html)
             contents = document.find('td', {'class': 'contents'})
             info_bar = contents.find('table', {'class': 'infobar'})
@@ -390,7 +674,7 @@ class MediaPoiskScraper(AbstractScraper):
         """
         url = "%s/media_show_page.php?section=%s&id=%d" % (self.base_url, section.filter_val, media_id)
 
-        with Timer(logger=self.log, name='Fetching URL'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Fetching URL'):
             html = self.fetch_page(url)
 
         return self._parse_details(html, section, media_id)
@@ -404,17 +688,20 @@ class MediaPoiskScraper(AbstractScraper):
         """
         url = "%s/media_show_page.php?section=%s&id=%d" % (self.base_url, section.filter_val, media_id)
 
-        with Timer(logger=self.log, name='Fetching URL'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Fetching URL'):
             html = self.fetch_page(url)
         folders = []
         warnings = 0
-        with Timer(logger=self.log, name='Parsing folders'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Parsing folders'):
+            from util.htmldocument import HtmlDocument
             document = HtmlDocument.from_string(html)
             copies_table = document.find('table', {'class': 'copies'})
             copies = copies_table.find("table", {'class': 'copy'})
             if not copies:
                 self.log.warn("No folders found.")
                 return []
+            folder_ids = [int(c.attr('id')[4:]) for c in copies if (c.attr('id') or '')[4:].isdigit()]
+            files = self._parse_files(copies_table, section, media_id, folder_ids)
             for c in copies:
                 try:
                     folder_id = int(c.attr('id')[4:])
@@ -494,9 +781,8 @@ class MediaPoiskScraper(AbstractScraper):
                             warnings += 1
 
                     quality = Quality(fmt, video_quality, audio_quality)
-                    files = self._parse_files(copies_table, section, media_id, folder_id)
                     folder = Folder(folder_id, media_id, title, flag, link, quality, languages, fmt,
-                                    embedded_subtitles, external_subtitles, size, files, section)
+                                    embedded_subtitles, external_subtitles, size, files.get(folder_id, []), section)
                     self.log.debug(repr(folder).decode("unicode-escape"))
                     folders.append(folder)
                 except Exception as e:
@@ -517,21 +803,31 @@ class MediaPoiskScraper(AbstractScraper):
         url = "%s/media_show_page.php?section=%s&id=%d&cid=%d" % (self.base_url, section.filter_val,
                                                                   media_id, folder_id)
 
-        with Timer(logger=self.log, name='Fetching URL'):
+        with Timer(logger=self.log, metrics=self.metrics, name='Fetching URL'):
             html = self.fetch_page(url)
 
+        from util.htmldocument import HtmlDocument
         document = HtmlDocument.from_string(html)
-        return self._parse_files(document, section, media_id, folder_id)
+        return self._parse_files(document, section, media_id, [folder_id])[folder_id]
+
+    def _parse_files(self, doc, section, media_id, folder_ids):
+        """
+        Parse the files table of the page and group files by folder ID (cid in the torrent link).
+        If there is only one folder, all files belong to it. If none of the links has a folder ID,
+        files are left to be fetched from the folder pages (folders get no files here).
 
-    def _parse_files(self, doc, section, media_id, folder_id):
-        files = []
+        :rtype : dict[int, list[File]]
+        """
+        files = dict((folder_id, []) for folder_id in folder_ids)
+        count = 0
         warnings = 0
-        with Timer(logger=self.log, name='Parsing files'):
+        unassigned = 0
+        with Timer(logger=self.log, metrics=self.metrics, name='Parsing files'):
             files_tr = doc.find('tr', {'class': 'files'})
             rows = files_tr.find('tr')[1:]
             if not rows:
                 self.log.warn("No files found.")
-                return []
+                return files
             for row in rows:
                 try:
                     cols = row.find('td')
@@ -548,6 +844,14 @@ class MediaPoiskScraper(AbstractScraper):
                         warnings += 1
                         continue
                     file_id = file_id.group(1)
+                    if len(folder_ids) == 1:
+                        folder_id = folder_ids[0]
+                    else:
+                        folder_id = re.search(r'cid=(\d+)', link)
+                        folder_id = folder_id and int(folder_id.group(1))
+                        if folder_id not in files:
+                            unassigned += 1
+                            continue
                     # noinspection PyAugmentAssignment
                     link = self.base_url + link
                     title = cols[2].text
@@ -557,11 +861,18 @@ class MediaPoiskScraper(AbstractScraper):
                     f = File(file_id, media_id, folder_id, title, flag, link, file_fmt,
                              duration, resolution, section)
                     self.log.debug(repr(f).decode("unicode-escape"))
-                    files.append(f)
+                    files[folder_id].append(f)
+                    count += 1
                 except Exception as e:
                     self.log.exception(e)
                     warnings += 1
-        self.log.info("Got %d file(s) successfully, %d warning(s)." % (len(files), warnings))
+            if unassigned:
+                warnings += 1
+                if not count:
+                    self.log.warn("No folder IDs in torrent links, files will be fetched from the folder pages.")
+                else:
+                    self.log.warn("Skipped %d file(s) of unknown folders.", unassigned)
+        self.log.info("Got %d file(s) successfully, %d warning(s)." % (count, warnings))
         return files
 
     @staticmethod
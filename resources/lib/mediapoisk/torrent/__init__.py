@@ -77,6 +77,19 @@ class TorrentClient:
         """
         raise NotImplementedError()
 
+    def add_many(self, torrents, download_dir):
+        """
+        :type download_dir: str
+        :type torrents: list[Torrent]
+        """
+        return [self.add(torrent, download_dir) for torrent in torrents]
+
+    def remove_many(self, torrent_ids):
+        """
+        :type torrent_ids: list[int]
+        """
+        return [self.remove(torrent_id) for torrent_id in torrent_ids]
+
 
 class TorrentStream:
     saved_files_needed = False
@@ -90,12 +103,14 @@ class TorrentStream:
         """
         raise NotImplementedError()
 
-    def play(self, player, torrent, list_item=None, file_id=None):
+    def play(self, player, torrent, list_item=None, file_id=None, next_torrent=None):
         """
         :type list_item: dict
         :type file_id: int
         :type torrent: Torrent
         :type player: AbstractPlayer
+        :param next_torrent: Torrent which is likely to be played next (e.g. next episode), may be prefetched
+        :type next_torrent: Torrent
         """
         raise NotImplementedError()
 
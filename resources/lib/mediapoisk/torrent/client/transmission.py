@@ -102,6 +102,18 @@ class TransmissionClient(TorrentClient):
                     'paused': paused
                 }})
 
+    def add_many(self, torrents, download_dir, paused=False):
+        """
+        Transmission RPC adds one torrent per torrent-add call, so it is a request per torrent
+
+        :type torrents: list[Torrent]
+        """
+        self.log.info("Adding %d torrent(s)", len(torrents))
+        return [self.add(torrent, download_dir, paused) for torrent in torrents]
+
+    def remove_many(self, torrent_ids, delete_local_data=False):
+        return self.remove(list(torrent_ids), delete_local_data)
+
     def remove(self, torrent_id, delete_local_data=False):
         self.log.info("Removing torrent %r from queue", torrent_id)
         if not isinstance(torrent_id, list):
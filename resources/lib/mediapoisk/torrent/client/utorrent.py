@@ -45,6 +45,7 @@ class UTorrentClient(TorrentClient):
             'cookie': re.compile('GUID=([^;]+);'),
             'token': re.compile("<div[^>]+id='token'[^>]*>([^<]+)</div>")
         }
+        self.session = None
 
     def list(self):
         obj = self.action(list=1)
@@ -92,13 +93,23 @@ class UTorrentClient(TorrentClient):
         self.log.info("Removing torrent %s from queue", torrent_id)
         return self.action(action='remove', hash=torrent_id)
 
-    def _add(self, download_dir, **query):
+    def remove_many(self, torrent_ids):
+        torrent_ids = list(torrent_ids)
+        self.log.info("Removing torrents %s from queue", torrent_ids)
+        return self.action(action='remove', hash=torrent_ids)
+
+    def add_many(self, torrents, download_dir):
+        """
+        Add torrents changing download dir only once per batch
+
+        :type torrents: list[Torrent]
+        """
         settings = self.get_settings()
         old_dir = settings.get('dir_active_download', None)
         download_dir = os.path.abspath(download_dir)
         self.set_download_dir(download_dir)
         try:
-            return self.action(**query)
+            return [self._add(torrent) for torrent in torrents]
         except UTorrentError, e:
             raise UTorrentError(32008, "Can't add torrent", cause=e)
         finally:
@@ -106,28 +117,45 @@ class UTorrentClient(TorrentClient):
                 self.set_download_dir(old_dir)
 
     def add(self, torrent, download_dir):
+        """
+        :type torrent: Torrent
+        """
+        return self.add_many([torrent], download_dir)[0]
+
+    def _add(self, torrent):
         """
         :type torrent: Torrent
         """
         if torrent.has_data() or torrent.has_file_name():
             self.log.info("Adding torrent from data")
-            return self._add(download_dir, action='add-file', upload_files={'name': 'torrent_file',
-                                                                            'content-type': 'application/x-bittorrent',
-                                                                            'body': torrent.data})
+            return self.action(action='add-file', upload_files={'name': 'torrent_file',
+                                                                'content-type': 'application/x-bittorrent',
+                                                                'body': torrent.data})
         elif torrent.has_url():
             self.log.info("Adding torrent from url (%s)", torrent.url)
-            return self._add(download_dir, action='add-url', s=torrent.url)
+            return self.action(action='add-url', s=torrent.url)
 
     def action(self, **query):
-        cookie, token = self.get_token()
-        query['token'] = token
         upload_files = query.pop('upload_files', None)
-        req = HttpRequest(self.url + '?' + urllib.urlencode(query), headers={'Cookie': cookie},
-                          auth_username=self.login, auth_password=self.password, upload_files=upload_files)
-        try:
-            response = self.http.fetch(req)
-        except urllib2.URLError, e:
-            raise UTorrentError(32005, "Can't connect to uTorrent", cause=e, check_settings=True)
+        refreshed = self.session is None
+        while True:
+            if self.session is None:
+                self.session = self.get_token()
+            cookie, token = self.session
+            query['token'] = token
+            req = HttpRequest(self.url + '?' + urllib.urlencode(query, True), headers={'Cookie': cookie},
+                              auth_username=self.login, auth_password=self.password, upload_files=upload_files)
+            try:
+                response = self.http.fetch(req)
+                break
+            except urllib2.URLError, e:
+                # cached token is expired?
+                if not refreshed and isinstance(e, urllib2.HTTPError) and e.code in [400, 401]:
+                    self.log.info("Session token is rejected, requesting new one...")
+                    self.session = None
+                    refreshed = True
+                    continue
+                raise UTorrentError(32005, "Can't connect to uTorrent", cause=e, check_settings=True)
 
         try:
             res = json.loads(response.body)
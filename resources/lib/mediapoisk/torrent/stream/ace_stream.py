@@ -2,6 +2,7 @@
 
 import logging
 import time
+import os
 
 from mediapoisk.torrent import *
 from mediapoisk.common import abort_requested, sleep
@@ -21,12 +22,16 @@ class AbortError(Exception):
 
 class AceStream(TorrentStream):
     POLL_DELAY = 0.5
+    # How often the session file is updated while the engine is in use, in seconds
+    SESSION_TOUCH_INTERVAL = 10
 
-    def __init__(self, engine, buffering_progress=None, playing_progress=None, log=None, playback_start_timeout=5):
+    def __init__(self, engine, buffering_progress=None, playing_progress=None, log=None, playback_start_timeout=5,
+                 session_file=None):
         """
         :type engine: Engine
         :type playing_progress: AbstractTorrentTransferProgress
         :type buffering_progress: AbstractTorrentTransferProgress
+        :param session_file: File to store the time engine was used last time at (in keep-alive mode)
         """
         TorrentStream.__init__(self)
         self.playing_progress = playing_progress or DummyTorrentTransferProgress()
@@ -34,6 +39,8 @@ class AceStream(TorrentStream):
         self.playback_start_timeout = playback_start_timeout
         self.log = log or logging.getLogger(__name__)
         self.engine = engine
+        self.session_file = session_file
+        self._session_touched = 0
         self._playing_aborted = False
 
     @staticmethod
@@ -76,7 +83,8 @@ class AceStream(TorrentStream):
         elif status.state in [State.ERROR]:
             raise AceStreamError(33049, "AceStream error (%s)", status.error)
 
-    def play(self, player, torrent, list_item=None, file_id=None):
+    # noinspection PyUnusedLocal
+    def play(self, player, torrent, list_item=None, file_id=None, next_torrent=None):
         """
         :type list_item: dict
         :type torrent: Torrent
@@ -88,6 +96,7 @@ class AceStream(TorrentStream):
         self.engine.on_poll = self._poll_engine
 
         list_item.setdefault('label', torrent.name)
+        self._touch_session()
         try:
             with closing(self.engine) as engine:
                 with closing(self.buffering_progress) as progress:
@@ -147,12 +156,17 @@ class AceStream(TorrentStream):
             self.log.info("Playback aborted.")
         except Error as err:
             raise self._convert_engine_error(err)
+        finally:
+            self._touch_session()
         if file_id in self.engine.saved_files:
             return [self.engine.saved_files[file_id]]
         return []
 
     def _poll_engine(self, delay):
-        sleep(int(delay*1000))
+        self.engine.wait_event(delay)
+        if time.time() - self._session_touched >= self.SESSION_TOUCH_INTERVAL:
+            # engine is in use, so it isn't shut down as idle while connecting or buffering
+            self._touch_session()
         if self._aborted():
             raise AbortError()
 
@@ -163,10 +177,41 @@ class AceStream(TorrentStream):
         """
         :type torrent: Torrent
         """
+        self._touch_session()
         try:
             with closing(self.engine) as engine:
                 engine.connect()
                 files = engine.load_data(torrent.data)
         except Error as err:
             raise self._convert_engine_error(err)
+        finally:
+            self._touch_session()
         return [f for f in torrent.files if f.index in files]
+
+    def _touch_session(self):
+        self._session_touched = time.time()
+        if self.engine.keep_alive and self.session_file:
+            with open(self.session_file, 'w') as f:
+                f.write(str(time.time()))
+
+    def shutdown_idle(self, idle_timeout):
+        """
+        Shut down the engine left running in keep-alive mode, if it wasn't used for idle_timeout seconds
+        """
+        if not self.session_file or not os.path.exists(self.session_file):
+            return False
+        try:
+            with open(self.session_file) as f:
+                last_used = float(f.read())
+        except (IOError, ValueError):
+            last_used = 0
+        if time.time() - last_used < idle_timeout:
+            return False
+        os.remove(self.session_file)
+        self.log.info("AceStream engine is idle, shutting it down...")
+        try:
+            self.engine.connect(timeout=5, start_engine=False)
+            self.engine.shutdown_engine()
+        except Error as err:
+            self.log.info("Can't connect to AceStream engine: %s", err)
+        return True
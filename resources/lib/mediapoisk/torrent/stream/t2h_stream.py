@@ -4,6 +4,9 @@ import logging
 import time
 import hashlib
 import os
+import socket
+import threading
+import urllib2
 
 from torrent2http import Error, State, Engine, MediaType
 from mediapoisk.common import abort_requested, sleep
@@ -17,13 +20,138 @@ class Torrent2HttpStreamError(TorrentStreamError):
     pass
 
 
+class RangePreBuffer(threading.Thread):
+    """
+    Reads the range of file served by torrent2http, so engine raises priority of the pieces covering that range
+    """
+    BUFFER_SIZE = 1024 * 64
+
+    def __init__(self, url, offset, length, log=None, timeout=30):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.url = url
+        self.offset = offset
+        self.length = length
+        self.timeout = timeout
+        self.log = log or logging.getLogger(__name__)
+        self.read_bytes = 0
+        self.active = True
+        self.failed = False
+
+    def run(self):
+        self.log.info("Requesting range %d-%d of %s", self.offset, self.offset + self.length - 1, self.url)
+        req = urllib2.Request(self.url, headers={'Range': 'bytes=%d-%d' % (self.offset,
+                                                                          self.offset + self.length - 1)})
+        try:
+            with closing(urllib2.urlopen(req, timeout=self.timeout)) as conn:
+                while self.active and self.read_bytes < self.length:
+                    buf = conn.read(min(self.BUFFER_SIZE, self.length - self.read_bytes))
+                    if not buf:
+                        break
+                    self.read_bytes += len(buf)
+        except (urllib2.URLError, socket.error) as e:
+            self.log.warn("Can't read range of %s: %s", self.url, e)
+            self.failed = True
+
+    def is_done(self):
+        return self.read_bytes >= self.length
+
+    def stop(self):
+        self.active = False
+
+
+def resume_file_path(engine, url):
+    """
+    :type engine: Engine
+    """
+    return os.path.join(engine.download_path, hashlib.md5(url).hexdigest() + ".resume")
+
+
+class TorrentPrefetch(threading.Thread):
+    """
+    Downloads the beginning and the end of the first video file of the torrent using separate engine,
+    so the pieces are already stored in download path when the torrent will be played.
+
+    The torrent URL is written to marker_path (if given) until the torrent is played; removing the marker
+    stops the prefetching. While the engine runs, a file with .running suffix exists next to the marker.
+    """
+    SLEEP_DELAY = 0.5
+
+    def __init__(self, engine, torrent, head_bytes, tail_bytes=0, log=None, marker_path=None):
+        """
+        :type engine: Engine
+        :type torrent: Torrent
+        """
+        threading.Thread.__init__(self)
+        self.engine = engine
+        self.torrent = torrent
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.log = log or logging.getLogger(__name__)
+        self.marker_path = marker_path
+        self.active = True
+
+    def run(self):
+        tail = None
+        self.log.info("Prefetching %s...", self.torrent.url)
+        if self.marker_path:
+            for path in [self.marker_path, self.marker_path + '.running']:
+                with open(path, 'w') as f:
+                    f.write(self.torrent.url)
+        try:
+            with closing(self.engine):
+                self.engine.uri = self.torrent.url
+                self.engine.resume_file = resume_file_path(self.engine, self.torrent.url)
+                self.engine.start(0)
+                while self.active:
+                    if self.marker_path and not os.path.exists(self.marker_path):
+                        self.log.info("Prefetched torrent is played, stopping prefetching.")
+                        break
+                    time.sleep(self.SLEEP_DELAY)
+                    status = self.engine.status()
+                    self.engine.check_torrent_error(status)
+                    if status.state in [State.FINISHED, State.SEEDING]:
+                        break
+                    if status.state != State.DOWNLOADING:
+                        continue
+                    files = self.engine.list(media_types=[MediaType.VIDEO])
+                    if not files:
+                        continue
+                    file_status = files[0]
+                    head_bytes = min(self.head_bytes, file_status.size)
+                    if tail is None:
+                        tail_bytes = min(self.tail_bytes, max(file_status.size - head_bytes, 0))
+                        if tail_bytes:
+                            tail = RangePreBuffer(file_status.url, file_status.size - tail_bytes, tail_bytes, self.log)
+                            tail.start()
+                    elif tail and tail.failed:
+                        self.log.warn("Prefetching of the file end failed, prefetching the beginning only.")
+                        tail = False
+                    if file_status.download >= head_bytes and (not tail or tail.is_done()):
+                        break
+                self.log.info("Prefetching of %s finished.", self.torrent.url)
+        except Error as e:
+            self.log.warn("Prefetching of %s failed: %s", self.torrent.url, e)
+        finally:
+            if tail:
+                tail.stop()
+            if self.marker_path and os.path.exists(self.marker_path + '.running'):
+                os.remove(self.marker_path + '.running')
+
+    def stop(self):
+        self.active = False
+
+
 class Torrent2HttpStream(TorrentStream):
     SLEEP_DELAY = 500
+    PREFETCH_HANDOVER_TIMEOUT = 10
 
     def __init__(self, engine, buffering_progress=None, playing_progress=None, pre_buffer_bytes=0, log=None,
-                 playback_start_timeout=5):
+                 playback_start_timeout=5, pre_buffer_tail_bytes=0, prefetch_engine=None, prefetch_percent=0,
+                 prefetch_marker_path=None, prefetch_timeout=600):
         """
         :type engine: Engine
+        :type prefetch_engine: Engine
         :type playing_progress: AbstractTorrentTransferProgress
         :type buffering_progress: AbstractTorrentTransferProgress
         """
@@ -34,6 +162,11 @@ class Torrent2HttpStream(TorrentStream):
         self.buffering_progress = buffering_progress or DummyTorrentTransferProgress()
         self.playing_progress = playing_progress or DummyTorrentTransferProgress()
         self.pre_buffer_bytes = pre_buffer_bytes
+        self.pre_buffer_tail_bytes = pre_buffer_tail_bytes
+        self.prefetch_engine = prefetch_engine
+        self.prefetch_percent = prefetch_percent
+        self.prefetch_marker_path = prefetch_marker_path
+        self.prefetch_timeout = prefetch_timeout
         self.playback_start_timeout = playback_start_timeout
         self._playing_aborted = False
 
@@ -102,67 +235,110 @@ class Torrent2HttpStream(TorrentStream):
         return abort_requested() or self.buffering_progress.is_cancelled() or \
             self.playing_progress.is_cancelled()
 
-    def play(self, player, torrent, list_item=None, file_id=None):
+    def _clear_prefetch_marker(self, torrent):
+        """
+        Prefetched pieces are not needed to be kept anymore when the prefetched torrent is played
+        """
+        path = self.prefetch_marker_path
+        if path and os.path.exists(path):
+            with open(path) as f:
+                url = f.read()
+            if url == torrent.url:
+                os.remove(path)
+                # prefetching engine (possibly of another plugin call) stops when the marker is removed
+                started = time.time()
+                while os.path.exists(path + '.running') and \
+                        time.time() - started < self.PREFETCH_HANDOVER_TIMEOUT and not abort_requested():
+                    sleep(self.SLEEP_DELAY)
+
+    def play(self, player, torrent, list_item=None, file_id=None, next_torrent=None):
         """
         :type list_item: dict
         :type torrent: Torrent
         :type player: AbstractPlayer
+        :type next_torrent: Torrent
         """
         list_item = list_item or {}
         file_status = status = None
         subtitles = None
+        prefetch = None
+        self._clear_prefetch_marker(torrent)
 
         try:
             with closing(self.engine):
                 self.log.info("Starting torrent2http engine...")
                 self.engine.uri = torrent.url
-                resume_file = hashlib.md5(torrent.url).hexdigest() + ".resume"
-                self.engine.resume_file = os.path.join(self.engine.download_path, resume_file)
+                self.engine.resume_file = resume_file_path(self.engine, torrent.url)
                 self.engine.start(file_id or 0)
                 ready = False
 
-                if self.pre_buffer_bytes:
+                if self.pre_buffer_bytes or self.pre_buffer_tail_bytes:
+                    tail = None
                     with closing(self.buffering_progress):
                         self.log.info("Start prebuffering...")
                         self.buffering_progress.open()
-                        while not self._aborted():
-                            sleep(self.SLEEP_DELAY)
-                            status = self.engine.status()
-                            self.engine.check_torrent_error(status)
-                            if file_id is None:
-                                files = self.engine.list(media_types=[MediaType.VIDEO])
-                                if files is None:
-                                    continue
-                                if not files:
-                                    raise Torrent2HttpStreamError(33050, "No playable files detected")
-                                file_id = files[0].index
-                                file_status = files[0]
-                                self.log.info("Detected video file: %s", file_status)
-                                sub_files = self.engine.list(media_types=[MediaType.SUBTITLES])
-                                if sub_files:
-                                    self.log.info("Detected subtitles: %s", sub_files[0])
-                                    subtitles = sub_files[0]
-                            else:
-                                file_status = self.engine.file_status(file_id)
-                                if not file_status:
-                                    continue
-                            if status.state == State.DOWNLOADING:
-                                state = TorrentStatus.PREBUFFERING
-                                self.buffering_progress.size = self.pre_buffer_bytes
-                                if file_status.download >= self.pre_buffer_bytes:
+                        try:
+                            while not self._aborted():
+                                sleep(self.SLEEP_DELAY)
+                                status = self.engine.status()
+                                self.engine.check_torrent_error(status)
+                                if file_id is None:
+                                    files = self.engine.list(media_types=[MediaType.VIDEO])
+                                    if files is None:
+                                        continue
+                                    if not files:
+                                        raise Torrent2HttpStreamError(33050, "No playable files detected")
+                                    file_id = files[0].index
+                                    file_status = files[0]
+                                    self.log.info("Detected video file: %s", file_status)
+                                    sub_files = self.engine.list(media_types=[MediaType.SUBTITLES])
+                                    if sub_files:
+                                        self.log.info("Detected subtitles: %s", sub_files[0])
+                                        subtitles = sub_files[0]
+                                else:
+                                    file_status = self.engine.file_status(file_id)
+                                    if not file_status:
+                                        continue
+                                ranges = None
+                                if status.state == State.DOWNLOADING:
+                                    state = TorrentStatus.PREBUFFERING
+                                    head_bytes = min(self.pre_buffer_bytes, file_status.size)
+                                    if tail is None:
+                                        tail_bytes = min(self.pre_buffer_tail_bytes,
+                                                         max(file_status.size - head_bytes, 0))
+                                        if tail_bytes:
+                                            tail = RangePreBuffer(file_status.url, file_status.size - tail_bytes,
+                                                                  tail_bytes, self.log)
+                                            tail.start()
+                                    elif tail and tail.failed:
+                                        # playback starts without the file end then
+                                        self.log.warn("Prebuffering of the file end failed, "
+                                                      "prebuffering the beginning only.")
+                                        tail = False
+                                    head_transferred = min(file_status.download, head_bytes)
+                                    tail_transferred = tail.read_bytes if tail else 0
+                                    tail_bytes = tail.length if tail else 0
+                                    if head_transferred >= head_bytes and (not tail or tail.is_done()):
+                                        ready = True
+                                        break
+                                    self.buffering_progress.size = head_bytes + tail_bytes
+                                    transferred = head_transferred + tail_transferred
+                                    ranges = [(head_transferred, head_bytes), (tail_transferred, tail_bytes)]
+                                elif status.state in [State.FINISHED, State.SEEDING]:
                                     ready = True
                                     break
-                            elif status.state in [State.FINISHED, State.SEEDING]:
-                                ready = True
-                                break
-                            else:
-                                self.buffering_progress.size = file_status.size
-                                state = self._convert_state(status.state)
-
-                            self.buffering_progress.name = status.name
-                            self.buffering_progress.update_status(state, file_status.download, status.download_rate,
-                                                                  status.upload_rate, status.num_seeds,
-                                                                  status.num_peers)
+                                else:
+                                    self.buffering_progress.size = file_status.size
+                                    transferred = file_status.download
+                                    state = self._convert_state(status.state)
+
+                                self.buffering_progress.name = status.name
+                                self.buffering_progress.update_status(state, transferred, status.download_rate,
+                                                                      status.upload_rate, status.num_seeds,
+                                                                      status.num_peers, ranges=ranges)
+                        finally:
+                            if tail:
+                                tail.stop()
                 else:
                     while not self._aborted():
                         sleep(self.SLEEP_DELAY)
@@ -191,12 +367,28 @@ class Torrent2HttpStream(TorrentStream):
                             state = self._convert_state(status.state)
                             self.playing_progress.update_status(state, file_status.download, status.download_rate,
                                                                 status.upload_rate, status.num_seeds, status.num_peers)
-                            player.get_percent()
+                            percent = player.get_percent()
+                            if prefetch is None and next_torrent and self.prefetch_engine and \
+                                    self.prefetch_percent and percent >= self.prefetch_percent and \
+                                    status.state in [State.FINISHED, State.SEEDING]:
+                                prefetch = TorrentPrefetch(self.prefetch_engine, next_torrent, self.pre_buffer_bytes,
+                                                           self.pre_buffer_tail_bytes, self.log,
+                                                           self.prefetch_marker_path)
+                                prefetch.start()
 
                         # handling PLAYBACK_STOPPED and PLAYBACK_ENDED events
                         sleep(1000)
         except Error as err:
             raise self._convert_engine_error(err)
+        finally:
+            if prefetch:
+                # prefetching goes on after the playback, until the prefetched torrent is played or timeout
+                started = time.time()
+                while prefetch.is_alive() and not abort_requested() and \
+                        time.time() - started < self.prefetch_timeout:
+                    prefetch.join(self.SLEEP_DELAY / 1000.0)
+                prefetch.stop()
+                prefetch.join()
         if status and file_status and status.state in [State.FINISHED, State.SEEDING]:
             files = [file_status.save_path]
             if subtitles and os.path.exists(subtitles.save_path):
@@ -159,7 +159,12 @@ class XbmcTorrentTransferProgress(AbstractTorrentTransferProgress):
         if self.state in [TorrentStatus.DOWNLOADING, TorrentStatus.SEEDING,
                           TorrentStatus.CHECKING, TorrentStatus.PREBUFFERING]:
             size = self._human_size(self.size) if self.size >= 0 else lang(33015)
-            lines.append(lang(33013) % {'transferred': self._human_size(self._transferred_bytes),
+            if self.ranges and self.state == TorrentStatus.PREBUFFERING:
+                lines.append(lang(33017) % {'head': self._range_percent(*self.ranges[0]),
+                                            'tail': self._range_percent(*self.ranges[-1]),
+                                            'state': self.state.localized})
+            else:
+                lines.append(lang(33013) % {'transferred': self._human_size(self._transferred_bytes),
                                             'total': size,
                                             'state': self.state.localized})
             if self.state != TorrentStatus.CHECKING:
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+
+from collections import deque
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of calls in flight with AIMD (additive increase, multiplicative decrease):
+    the limit grows by one per limit-worth of successful calls while latency stays within tolerance
+    times the median of recent ones, and is multiplied by backoff on overload (reported by the caller)
+    or latency spikes, at most once per backoff_interval.
+
+    The learned limit is read from and saved to state (a dict-like storage), if given.
+    """
+
+    def __init__(self, limit=5, min_limit=1, max_limit=20, backoff=0.5, tolerance=2.0, backoff_interval=1.0,
+                 min_samples=5, history=50, state=None, state_key='concurrency_limit', log=None, metrics=None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.backoff_interval = backoff_interval
+        self.min_samples = min_samples
+        self.state = state
+        self.state_key = state_key
+        self.log = log or logging.getLogger(__name__)
+        self.metrics = metrics
+        if state is not None and state_key in state:
+            limit = state[state_key]
+        self.limit = float(min(max_limit, max(min_limit, limit)))
+        self.latencies = deque(maxlen=history)
+        self.in_flight = 0
+        self.last_backoff = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, overloaded=False):
+        """
+        :param latency: Call latency, None if the call failed for a reason other than overload
+        :param overloaded: Call failed because the server is overloaded (5xx error or timeout)
+        """
+        with self.cond:
+            self.in_flight -= 1
+            if overloaded or latency is not None and self._is_spike(latency):
+                now = time.time()
+                if now - self.last_backoff >= self.backoff_interval:
+                    self.last_backoff = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.log.info("Backing off, concurrency limit is %d", self.limit)
+                    if self.metrics is not None:
+                        self.metrics.incr('aimd.backoffs')
+            elif latency is not None:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if latency is not None and not overloaded:
+                self.latencies.append(latency)
+            self.cond.notify_all()
+
+    def _is_spike(self, latency):
+        if len(self.latencies) < self.min_samples:
+            return False
+        samples = sorted(self.latencies)
+        return latency > self.tolerance * samples[len(samples) // 2]
+
+    def save(self):
+        if self.state is not None:
+            self.state[self.state_key] = self.limit
+        if self.metrics is not None:
+            self.metrics.observe('aimd.limit', self.limit)
@@ -0,0 +1,147 @@
+"""
+Lightweight enumerations with members built from plain values.
+
+Mostly compatible with util.enum for the way enums are used in this addon, but
+much cheaper to create: members are slotted instances built straight from the
+class attributes, with name and value lookup dicts prebuilt once. Members pickle
+the same way as util.enum members do (class and value), so pickles made by one
+load with the other.
+"""
+
+__all__ = ['FrozenEnumMeta', 'FrozenEnum']
+
+
+def _is_member(name, value):
+    return not name.startswith('_') and not (hasattr(value, '__get__') or hasattr(value, '__set__') or
+                                             hasattr(value, '__delete__'))
+
+
+class FrozenEnumMeta(type):
+    """Metaclass for FrozenEnum"""
+
+    def __new__(metacls, cls, bases, classdict):
+        members = [(k, v) for k, v in classdict.items() if _is_member(k, v)]
+        for name, value in members:
+            del classdict[name]
+        classdict.setdefault('__slots__', ())
+        enum_class = super(FrozenEnumMeta, metacls).__new__(metacls, cls, bases, classdict)
+        slots = []
+        for klass in reversed(enum_class.__mro__):
+            slots.extend(klass.__dict__.get('__slots__', ()))
+        type.__setattr__(enum_class, '_slots_', tuple(slots))
+
+        member_names = []
+        member_map = {}
+        value_map = {}
+        # same order as util.enum has on Python 2
+        try:
+            members.sort(key=lambda item: item[1])
+        except TypeError:
+            members.sort()
+        for name, value in members:
+            if value in value_map:
+                # alias
+                member = value_map[value]
+            else:
+                member = object.__new__(enum_class)
+                member._name_ = name
+                member._value_ = value
+                member.__init__(*(value if isinstance(value, tuple) else (value,)))
+                member_names.append(name)
+                value_map[value] = member
+            member_map[name] = member
+            type.__setattr__(enum_class, name, member)
+        type.__setattr__(enum_class, '_member_names_', member_names)
+        type.__setattr__(enum_class, '_member_map_', member_map)
+        type.__setattr__(enum_class, '_value2member_map_', value_map)
+        return enum_class
+
+    def __call__(cls, value):
+        """Returns member by value, used by pickle"""
+        if type(value) is cls:
+            return value
+        try:
+            return cls._value2member_map_[value]
+        except (KeyError, TypeError):
+            raise ValueError("%s is not a valid %s" % (value, cls.__name__))
+
+    def __contains__(cls, member):
+        return isinstance(member, cls) and member.name in cls._member_map_
+
+    def __getitem__(cls, name):
+        return cls._member_map_[name]
+
+    def __iter__(cls):
+        return (cls._member_map_[name] for name in cls._member_names_)
+
+    def __reversed__(cls):
+        return (cls._member_map_[name] for name in reversed(cls._member_names_))
+
+    def __len__(cls):
+        return len(cls._member_names_)
+
+    @property
+    def __members__(cls):
+        return dict(cls._member_map_)
+
+    def __repr__(cls):
+        return "<enum %r>" % cls.__name__
+
+    def __setattr__(cls, name, value):
+        if name in cls.__dict__.get('_member_map_', {}):
+            raise AttributeError('Cannot reassign members.')
+        super(FrozenEnumMeta, cls).__setattr__(name, value)
+
+    def __delattr__(cls, name):
+        if name in cls.__dict__.get('_member_map_', {}):
+            raise AttributeError('Cannot delete member %s.' % name)
+        super(FrozenEnumMeta, cls).__delattr__(name)
+
+
+class FrozenEnum(object):
+    """Generic frozen enumeration.
+
+    Derive from this class to define new enumerations. Subclasses defining
+    instance attributes must declare them in __slots__.
+    """
+    __metaclass__ = FrozenEnumMeta
+    __slots__ = ('_name_', '_value_')
+
+    def __init__(self, *args):
+        pass
+
+    @property
+    def name(self):
+        return self._name_
+
+    @property
+    def value(self):
+        return self._value_
+
+    def __repr__(self):
+        return "<%s.%s: %r>" % (self.__class__.__name__, self._name_, self._value_)
+
+    def __str__(self):
+        return "%s.%s" % (self.__class__.__name__, self._name_)
+
+    def __eq__(self, other):
+        if type(other) is self.__class__:
+            return self is other
+        return NotImplemented
+
+    def __ne__(self, other):
+        if type(other) is self.__class__:
+            return self is not other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._name_)
+
+    def __reduce_ex__(self, proto):
+        return self.__class__, (self._value_,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
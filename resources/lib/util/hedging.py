@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+
+from collections import deque
+
+
+class Hedger:
+    """
+    Hedged calls: if a call is not completed after the given percentile of recently observed latencies,
+    a duplicate call is made and the result of whichever completes first is returned.
+
+    Duplicate calls are limited by max_extra, a fraction of the total number of calls.
+    """
+
+    def __init__(self, percentile=95, max_extra=0.1, min_samples=10, history=100, max_workers=10,
+                 log=None, metrics=None):
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.log = log or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.latencies = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+
+    def delay(self):
+        """
+        Time after which a duplicate call is made, None if there are not enough latency samples yet
+        """
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(round(self.percentile / 100.0 * (len(samples) - 1))))]
+
+    def call(self, func, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            can_hedge = self.fired + 1 <= self.max_extra * self.calls
+        delay = self.delay() if can_hedge else None
+        started = time.time()
+        if delay is None:
+            result = func(*args, **kwargs)
+            self._observe(time.time() - started)
+            return result
+
+        from concurrent.futures import wait, FIRST_COMPLETED
+        executor = self._executor()
+        primary = executor.submit(func, *args, **kwargs)
+        done, not_done = wait([primary], delay)
+        if done or not self._fire():
+            result = primary.result()
+            self._observe(time.time() - started)
+            return result
+
+        self.log.debug("Call is not completed in %f seconds, hedging...", delay)
+        secondary = executor.submit(func, *args, **kwargs)
+        futures = [primary, secondary]
+        while True:
+            done, not_done = wait(futures, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+            if succeeded:
+                if primary not in succeeded:
+                    self._won()
+                self._observe(time.time() - started)
+                return succeeded[0].result()
+            if not not_done:
+                # both calls failed
+                return primary.result()
+            futures = list(not_done)
+
+    def _executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _fire(self):
+        with self.lock:
+            if self.fired + 1 > self.max_extra * self.calls:
+                return False
+            self.fired += 1
+        if self.metrics is not None:
+            self.metrics.incr('hedge.fired')
+        return True
+
+    def _won(self):
+        with self.lock:
+            self.won += 1
+        if self.metrics is not None:
+            self.metrics.incr('hedge.won')
+
+    def _observe(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
@@ -3,10 +3,14 @@
 import time
 import os
 import re
+import random
+import socket
 import logging
+import httplib
 import urllib
 import urllib2
 import cookielib
+import email.utils
 import base64
 import mimetools
 import itertools
@@ -19,16 +23,17 @@ from progress import LoggingFileTransferProgress
 
 class HttpClient:
     USER_AGENT = "Mozilla/5.0 (Windows NT 6.2; Win64; x64; rv:16.0.1) Gecko/20121011 Firefox/16.0.1"
-    RECOVERABLE_CODES = [500, 502, 503, 504]
+    RECOVERABLE_CODES = [429, 500, 502, 503, 504]
     CONTENT_DISPOSITION_RE = re.compile('attachment;\sfilename="*([^"\s]+)"|\s')
     DOWNLOAD_BUFFER_SIZE = 1024 * 128
 
-    def __init__(self, log=None, progress=None, cookie_jar=None, debug=0, **request_params):
+    def __init__(self, log=None, progress=None, cookie_jar=None, debug=0, metrics=None, **request_params):
         self.log = log or logging.getLogger(__name__)
         self.progress = progress or LoggingFileTransferProgress(log=self.log)
         self.cookie_jar = self._cookie_jar(cookie_jar)
         self.request_params = request_params
         self.debug = debug
+        self.metrics = metrics
 
     @staticmethod
     def _cookie_jar(cookie_jar):
@@ -40,31 +45,41 @@ class HttpClient:
 
     def fetch(self, request, **request_params):
         if not isinstance(request, HttpRequest):
-            params = self.request_params
+            params = dict(self.request_params)
             params.update(request_params)
             request = HttpRequest(request, **params)
 
         opener = self._build_opener(request)
         response = HttpResponse(request)
-        tries = request.tries
+        policy = request.retry_policy
+        attempt = 0
 
-        while tries > 0:
-            tries -= 1
+        while True:
+            attempt += 1
             self.log.info('Making %r', request)
+            self._incr('http.requests')
             try:
                 self._fetch(opener, request, response)
                 break
-            except urllib2.HTTPError, e:
-                if e.code in self.RECOVERABLE_CODES and tries > 0:
-                    self.log.info("%s, retrying in %d second(s)...", e, request.retry_timeout)
-                    time.sleep(request.retry_timeout)
-                    continue
-                raise
+            except Exception, e:
+                self._incr('http.errors')
+                delay = policy.retry_delay(e, attempt, time.time() - response.time)
+                if delay is None:
+                    raise
+                self.log.info("%s, retrying in %.1f second(s)...", e, delay)
+                self._incr('http.retries')
+                time.sleep(delay)
 
         response.time = time.time() - response.time
+        if self.metrics is not None:
+            self.metrics.observe('http.fetch', response.time)
         self.log.debug("Returned %r", response)
         return response
 
+    def _incr(self, name, value=1):
+        if self.metrics is not None:
+            self.metrics.incr(name, value)
+
     def _build_opener(self, request):
         """
         :type request: HttpRequest
@@ -85,8 +100,9 @@ class HttpClient:
                 proxy_auth_handler.add_password('realm', 'uri', request.proxy_username, request.proxy_password)
                 handlers.append(proxy_auth_handler)
 
-        if self.cookie_jar is not None:
-            handlers.append(urllib2.HTTPCookieProcessor(self.cookie_jar))
+        cookie_jar = request.cookie_jar if request.cookie_jar is not None else self.cookie_jar
+        if cookie_jar is not None:
+            handlers.append(urllib2.HTTPCookieProcessor(cookie_jar))
 
         return urllib2.build_opener(*handlers)
 
@@ -133,10 +149,12 @@ class HttpClient:
                 self._download(request.download_path, conn, response)
             else:
                 response.body = conn.read()
+                self._incr('http.bytes_received', len(response.body))
                 if 'content-encoding' in response.headers and response.headers['content-encoding'] == 'gzip':
                     buf = StringIO(response.body)
                     f = gzip.GzipFile(fileobj=buf)
                     response.body = f.read()
+                self._incr('http.bytes_decoded', len(response.body))
 
         if isinstance(self.cookie_jar, cookielib.FileCookieJar):
             self.cookie_jar.save()
@@ -191,6 +209,7 @@ class HttpClient:
                 read += len(buf)
                 fd.write(buf)
 
+        self._incr('http.bytes_received', read)
         if aborted:
             self.log.info("File '%s' transfer aborted!", name)
             response.filename = None
@@ -245,6 +264,73 @@ class HttpClient:
         return headers
 
 
+class RetryPolicy:
+    """
+    Retries of failed requests: recoverable HTTP errors (HttpClient.RECOVERABLE_CODES) and, if
+    retry_connection_errors is set, connection errors and timeouts.
+
+    Delays grow exponentially from base_delay up to max_delay with full jitter (random delay between
+    zero and the current maximum), so that parallel requests don't retry in lockstep. Delay given by
+    the Retry-After header takes precedence, but if it is longer than max_delay the request is not
+    retried. No retries are made after budget seconds since the first try.
+    """
+
+    def __init__(self, tries=1, base_delay=1, max_delay=30, budget=None, retry_connection_errors=True,
+                 codes=None):
+        self.tries = tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retry_connection_errors = retry_connection_errors
+        self.codes = codes if codes is not None else HttpClient.RECOVERABLE_CODES
+
+    def retry_delay(self, error, attempt, elapsed):
+        """
+        :param error: Exception of the failed attempt
+        :param attempt: Number of the failed attempt, starting from 1
+        :param elapsed: Time elapsed since the first attempt
+        :return: Delay before the next attempt or None, if the request shouldn't be retried
+        """
+        if attempt >= self.tries or not self.is_recoverable(error):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if isinstance(error, urllib2.HTTPError):
+            retry_after = self._retry_after(error)
+            if retry_after is not None:
+                if retry_after > self.max_delay:
+                    # retrying sooner than the server asks would only be refused again
+                    return None
+                delay = retry_after
+        if self.budget is not None and elapsed + delay > self.budget:
+            return None
+        return delay
+
+    def is_recoverable(self, error):
+        if isinstance(error, urllib2.HTTPError):
+            return error.code in self.codes
+        if not self.retry_connection_errors:
+            return False
+        if isinstance(error, urllib2.URLError):
+            return isinstance(error.reason, (socket.error, socket.timeout))
+        return isinstance(error, (socket.error, socket.timeout, httplib.HTTPException))
+
+    @staticmethod
+    def _retry_after(error):
+        value = error.hdrs and error.hdrs.get('Retry-After')
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        date = email.utils.parsedate_tz(value)
+        if date:
+            return max(0, email.utils.mktime_tz(date) - time.time())
+        return None
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ','.join('%s=%r' % i for i in sorted(self.__dict__.iteritems())))
+
+
 class HttpRequest:
     METHOD_GET = "GET"
     METHOD_POST = "POST"
@@ -252,7 +338,7 @@ class HttpRequest:
     def __init__(self, url, method='GET', headers=None, params=None, upload_files=None,
                  download_path=None, auth_username=None, auth_password=None, proxy_protocol=None, proxy_host=None,
                  proxy_port=None, proxy_username=None, proxy_password=None, timeout=None, handle_redirects=True,
-                 user_agent=None, tries=1, retry_timeout=1, use_gzip=True):
+                 user_agent=None, tries=1, retry_timeout=1, use_gzip=True, retry_policy=None, cookie_jar=None):
 
         self.url = url
         self.method = method
@@ -281,8 +367,10 @@ class HttpRequest:
 
         self.tries = tries
         self.retry_timeout = retry_timeout
+        self.retry_policy = retry_policy or RetryPolicy(tries, base_delay=retry_timeout)
         self.user_agent = user_agent
         self.use_gzip = use_gzip
+        self.cookie_jar = cookie_jar
 
     def __repr__(self):
         args = ','.join('%s=%r' % i for i in self.__dict__.iteritems() if i[1] is not None and i[0] != 'upload_files')
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import threading
+
+
+class Histogram:
+    """
+    Distribution of observed values. Count, sum, min and max are exact, percentiles
+    are computed from the last MAX_SAMPLES values.
+    """
+    MAX_SAMPLES = 1000
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = self.max = None
+        self.samples = []
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.samples.append(value)
+        if len(self.samples) > self.MAX_SAMPLES:
+            del self.samples[0]
+
+    def percentile(self, percent):
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(round(percent / 100.0 * (len(samples) - 1))))]
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, histograms and cache hit ratios, e.g. for
+    collecting util.timer.Timer intervals over a plugin call.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.caches = {}
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    def cache_access(self, name, hits=0, misses=0):
+        with self.lock:
+            stats = self.caches.setdefault(name, [0, 0])
+            stats[0] += hits
+            stats[1] += misses
+
+    def is_empty(self):
+        return not (self.counters or self.histograms or self.caches)
+
+    def snapshot(self):
+        """
+        :rtype : dict
+        """
+        with self.lock:
+            caches = {}
+            for name, (hits, misses) in self.caches.iteritems():
+                total = hits + misses
+                caches[name] = {'hits': hits, 'misses': misses, 'ratio': float(hits) / total if total else None}
+            return {
+                'time': time.time() - self.started,
+                'counters': dict(self.counters),
+                'histograms': dict((name, h.as_dict()) for name, h in self.histograms.iteritems()),
+                'caches': caches,
+            }
+
+    def to_json(self, **extra):
+        data = self.snapshot()
+        data.update(extra)
+        return json.dumps(data, sort_keys=True)
+
+    def dump(self, file_name, max_size=None, **extra):
+        """
+        Append the snapshot as a line of JSON to the file
+
+        :param max_size: Once the file is that large (in bytes), it is moved to <file_name>.1
+                         (replacing the previous one) and a new file is started
+        """
+        if max_size and os.path.exists(file_name) and os.path.getsize(file_name) >= max_size:
+            rotated = file_name + '.1'
+            try:
+                if os.path.exists(rotated):
+                    os.remove(rotated)
+                os.rename(file_name, rotated)
+            except OSError:
+                # rotated by a concurrent plugin call
+                pass
+        with open(file_name, 'a') as f:
+            f.write(self.to_json(timestamp=time.time(), **extra) + '\n')
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+            self.caches.clear()
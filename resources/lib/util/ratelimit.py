@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileTokenBucket:
+    """
+    Token bucket rate limiter shared between processes through a locked state file.
+
+    Tokens are refilled at rate per second up to burst. Only background calls are limited:
+    they leave reserve tokens for foreground ones and wait while there were foreground calls
+    in the last foreground_grace seconds. Foreground calls never wait, but take a token anyway
+    (going into debt of up to burst tokens), so that background calls give way to them.
+    """
+
+    def __init__(self, path, rate=5.0, burst=10, reserve=None, foreground_grace=2.0, log=None, metrics=None):
+        self.path = path
+        self.rate = float(rate)
+        self.burst = burst
+        self.reserve = reserve if reserve is not None else burst // 2
+        self.foreground_grace = foreground_grace
+        self.log = log or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.lock = threading.Lock()
+
+    def acquire(self, background=False, max_wait=None):
+        """
+        Take a token, waiting until one is available, but not longer than max_wait seconds
+
+        :rtype : float
+        :return: Time waited
+        """
+        started = time.time()
+        while True:
+            wait = self._take(background)
+            waited = time.time() - started
+            if not wait:
+                break
+            if max_wait is not None and waited + wait > max_wait:
+                self.log.info("Rate limit wait exceeded %.1f seconds, going on", max_wait)
+                break
+            time.sleep(min(wait, 0.5))
+        if self.metrics is not None:
+            self.metrics.observe('ratelimit.wait' + ('.background' if background else ''), waited)
+        return waited
+
+    def _take(self, background):
+        """
+        :return: 0 if the token was taken, otherwise time to wait before the next try
+        """
+        with self.lock:
+            with open(self.path, 'a+') as f:
+                self._lock_file(f)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read())
+                    except ValueError:
+                        state = {}
+                    now = time.time()
+                    last = min(now, state.get('time', now))
+                    tokens = min(self.burst, state.get('tokens', self.burst) + (now - last) * self.rate)
+                    foreground = state.get('foreground', 0)
+
+                    wait = 0
+                    if background:
+                        needed = 1 + self.reserve
+                        if now - foreground < self.foreground_grace:
+                            wait = foreground + self.foreground_grace - now
+                        if tokens < needed:
+                            wait = max(wait, (needed - tokens) / self.rate)
+                        if not wait:
+                            tokens -= 1
+                    else:
+                        foreground = now
+                        tokens = max(-self.burst, tokens - 1)
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({'tokens': tokens, 'time': now, 'foreground': foreground}))
+                    f.flush()
+                    return wait
+                finally:
+                    self._unlock_file(f)
+
+    @staticmethod
+    def _lock_file(f):
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    @staticmethod
+    def _unlock_file(f):
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
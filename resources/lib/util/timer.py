@@ -6,7 +6,8 @@ import logging
 
 
 class Timer:
-    def __init__(self, timer=None, disable_gc=False, logger=None, log_level=logging.DEBUG, name="Total time"):
+    def __init__(self, timer=None, disable_gc=False, logger=None, log_level=logging.DEBUG, name="Total time",
+                 metrics=None):
         if timer is None:
             timer = timeit.default_timer
         self.timer = timer
@@ -14,6 +15,7 @@ class Timer:
         self.logger = logger
         self.log_level = log_level
         self.name = name
+        self.metrics = metrics
         self.start = self.end = self.interval = None
 
     def __enter__(self):
@@ -28,5 +30,7 @@ class Timer:
         if self.disable_gc and self.gc_state:
             gc.enable()
         self.interval = self.end - self.start
+        if self.metrics is not None:
+            self.metrics.observe(self.name, self.interval)
         if self.logger:
             self.logger.log(self.log_level, '%s taken: %f seconds' % (self.name, self.interval))
\ No newline at end of file
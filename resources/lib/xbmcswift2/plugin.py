@@ -10,6 +10,7 @@
 """
 import os
 import sys
+import time
 import xbmcswift2
 
 try:
@@ -17,8 +18,13 @@ try:
 except ImportError:
     from cgi import parse_qs
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from util.ordereddict import OrderedDict
+
 from logger import log, setup_log
-from urls import UrlRule, NotFoundException, AmbiguousUrlException
+from urls import UrlRule, UrlDispatcher, LazyView, NotFoundException, AmbiguousUrlException
 from xbmcswift2 import xbmc, xbmcaddon, Request, xbmcvfs
 from xbmcmixin import XBMCMixin
 
@@ -56,10 +62,18 @@ class Plugin(XBMCMixin):
                      testing.
     """
 
+    #: Number of recently built urls kept by url_for
+    URL_CACHE_SIZE = 256
+
+    #: Types of url_for items that can be safely cached
+    URL_CACHE_TYPES = (basestring, int, long, float, bool, type(None))
+
     def __init__(self, name=None, addon_id=None, filepath=None, info_type=None):
         self._name = name
         self._routes = []
+        self._dispatcher = None
         self._view_functions = {}
+        self._url_cache = OrderedDict()
 
         # addon_id is no longer required as it can be parsed from addon.xml
         if addon_id:
@@ -253,6 +267,19 @@ class Plugin(XBMCMixin):
         The route decorator provides the same functionality.
         """
         rule = UrlRule(url_rule, view_func, name, options)
+        lazy_rule = self._view_functions.get(name)
+        if lazy_rule and isinstance(lazy_rule.view_func, LazyView) and not isinstance(view_func, LazyView):
+            # The module of a lazy rule is loaded, bind the actual view
+            if lazy_rule.url_format != rule.url_format:
+                log.warning('Url rule "%s" named "%s" was declared as "%s"',
+                            url_rule, name, lazy_rule.url_format)
+            log.debug('Binding url rule "%s" named "%s" to function "%s"',
+                      url_rule, name, view_func.__name__)
+            self._view_functions[name] = rule
+            self._routes[self._routes.index(lazy_rule)] = rule
+            self._dispatcher = None
+            self._url_cache.clear()
+            return
         if name in self._view_functions.keys():
             # TODO: Raise exception for ambiguous views during registration
             log.warning('Cannot add url rule "%s" with name "%s". There is '
@@ -263,6 +290,17 @@ class Plugin(XBMCMixin):
                       '"%s"', url_rule, name, view_func.__name__)
             self._view_functions[name] = rule
         self._routes.append(rule)
+        self._dispatcher = None
+        self._url_cache.clear()
+
+    def add_lazy_url_rule(self, url_rule, module_name, func_name, name=None, options=None):
+        """Adds a URL rule whose view function is defined in a module which
+        is not imported yet. The module gets imported when the rule is
+        dispatched, and the route decorators in it then bind the actual view
+        function to the rule. Until then url_for works by the rule name.
+        """
+        view_func = LazyView(module_name, func_name)
+        self.add_url_rule(url_rule, view_func, name=name or func_name, options=options)
 
     def url_for(self, endpoint, **items):
         """Returns a valid XBMC plugin URL for the given endpoint name.
@@ -273,6 +311,16 @@ class Plugin(XBMCMixin):
         Raises AmbiguousUrlException if there is more than one possible
         view for the given endpoint name.
         """
+        # Only urls made of plain values are cached. Value types are part of
+        # the key, since e.g. 1 == True but they make different urls
+        key = None
+        if all(isinstance(v, self.URL_CACHE_TYPES) for v in items.itervalues()):
+            key = (endpoint, tuple(sorted((k, v.__class__, v) for k, v in items.iteritems())))
+            url = self._url_cache.pop(key, None)
+            if url is not None:
+                self._url_cache[key] = url
+                return url
+
         try:
             rule = self._view_functions[endpoint]
         except KeyError:
@@ -290,28 +338,35 @@ class Plugin(XBMCMixin):
             raise AmbiguousUrlException
 
         pathqs = rule.make_path_qs(items)
-        return 'plugin://%s%s' % (self._addon_id, pathqs)
+        url = 'plugin://%s%s' % (self._addon_id, pathqs)
+        if key is not None:
+            self._url_cache[key] = url
+            if len(self._url_cache) > self.URL_CACHE_SIZE:
+                self._url_cache.popitem(last=False)
+        return url
 
     def _dispatch(self, path):
-        for rule in self._routes:
-            try:
-                view_func, items = rule.match(path)
-            except NotFoundException:
-                continue
-            log.info('Request for "%s" matches rule for function "%s"',
-                     path, view_func.__name__)
-            listitems = view_func(**items)
-            # Only call self.finish() for UI container listing calls to plugin
-            # (handle will be >= 0). Do not call self.finish() when called via
-            # RunPlugin() (handle will be -1).
-            if not self._end_of_directory and self.handle >= 0:
-                if listitems is None:
-                    self.finish(succeeded=False)
-                else:
-                    listitems = self.finish(listitems)
-
-            return listitems
-        raise NotFoundException('No matching view found for %s' % path)
+        started = time.time()
+        if self._dispatcher is None:
+            self._dispatcher = UrlDispatcher(self._routes)
+        rule, items = self._dispatcher.match(path)
+        if rule is None:
+            raise NotFoundException('No matching view found for %s' % path)
+        view_func = rule.view_func
+        matched = time.time()
+        log.info('Request for "%s" matches rule for function "%s" (%.1f ms)',
+                 path, view_func.__name__, (matched - started) * 1000)
+        listitems = view_func(**items)
+        # Only call self.finish() for UI container listing calls to plugin
+        # (handle will be >= 0). Do not call self.finish() when called via
+        # RunPlugin() (handle will be -1).
+        if not self._end_of_directory and self.handle >= 0:
+            if listitems is None:
+                self.finish(succeeded=False)
+            else:
+                listitems = self.finish(listitems)
+        log.info('View "%s" took %.1f ms', rule.name, (time.time() - matched) * 1000)
+        return listitems
 
     def redirect(self, url):
         """Used when you need to redirect to another view, and you only
@@ -340,4 +395,9 @@ class Plugin(XBMCMixin):
         log.debug('Handling incoming request for %s', self.request.path)
         items = self._dispatch(self.request.path)
         self.close_storages()
+        stats = self.settings_stats()
+        if stats:
+            log.debug('Settings snapshot: %d loads in %.1f ms, %d hits, %d addon API calls in %.1f ms',
+                      stats['loads'], stats['load_time'] * 1000, stats['hits'], stats['misses'],
+                      stats['api_time'] * 1000)
         return items
@@ -21,6 +21,30 @@ class NotFoundException(Exception):
     pass
 
 
+_INT_RE = re.compile(r'^\s*[-+]?\d+\s*$')
+
+
+class LazyView(object):
+    """A view function placeholder which imports the module defining the
+    actual view on first call.
+
+    :param module_name: The dotted name of the module defining the view.
+    :param func_name: The name of the view function in that module.
+    """
+
+    def __init__(self, module_name, func_name):
+        self.module_name = module_name
+        self.__name__ = func_name
+
+    def resolve(self):
+        """Imports the module and returns the actual view function."""
+        module = __import__(self.module_name, fromlist=[self.__name__])
+        return getattr(module, self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
 class UrlRule(object):
     """This object stores the various properties related to a routing URL rule.
     It also provides a few methods to create URLs from the rule or to match a
@@ -49,6 +73,13 @@ class UrlRule(object):
         # change <> to {} for use with str.format()
         self._url_format = self._url_rule.replace('<', '{').replace('>', '}')
 
+        # Precompiled path builder: literal parts of the rule with keyword
+        # slots at odd positions, filled in by make_path_qs
+        self._path_parts = re.split(r'<(.+?)>', url_rule)
+        self._path_slots = [(i, self._path_parts[i]) for i in range(1, len(self._path_parts), 2)]
+        self._path_defaults = dict((key, val) for key, val in self._options.items()
+                                   if key in self._keywords)
+
         # Make a regex pattern for matching incoming URLs
         rule = self._url_rule
         if rule != '/':
@@ -56,6 +87,10 @@ class UrlRule(object):
             rule = self._url_rule.rstrip('/') + '/?'
         p = rule.replace('<', '(?P<').replace('>', '>[^/]+?)')
 
+        # The same pattern without group names, used by UrlDispatcher where
+        # several rules are joined into one regex
+        self._pattern = re.sub(r'<.+?>', '([^/]+?)', rule)
+
         try:
             self._regex = re.compile('^' + p + '$')
         except re.error:
@@ -86,46 +121,28 @@ class UrlRule(object):
         if not m:
             raise NotFoundException
 
+        return self._view_func, self.make_items(m.groupdict())
+
+    def make_items(self, values):
+        """Returns a dictionary of items to be passed to the view function
+        for the given dictionary of matched (still quoted) path values.
+        """
         # urlunencode the values
         items = dict((key, unquote_plus(val))
-                     for key, val in m.groupdict().items())
+                     for key, val in values.items())
 
         # unpickle any items if present
         items = unpickle_dict(items)
 
         # Convert string to integers where possible
         for key, val in items.items():
-            if isinstance(val, basestring):
-                try:
-                    items[key] = int(val)
-                except ValueError:
-                    pass
+            if isinstance(val, basestring) and _INT_RE.match(val):
+                items[key] = int(val)
 
         # We need to update our dictionary with default values provided in
         # options if the keys don't already exist.
         [items.setdefault(key, val) for key, val in self._options.items()]
-        return self._view_func, items
-
-    def _make_path(self, items):
-        """Returns a relative path for the given dictionary of items.
-
-        Uses this url rule's url pattern and replaces instances of <var_name>
-        with the appropriate value from the items dict.
-        """
-        for key, val in items.items():
-            if not isinstance(val, basestring):
-                raise TypeError('Value "%s" for key "%s" must be an instance'
-                                ' of basestring' % (val, key))
-            items[key] = quote_plus(val)
-
-        try:
-            path = self._url_format.format(**items)
-        except AttributeError:
-            # Old version of python
-            path = self._url_format
-            for key, val in items.items():
-                path = path.replace('{%s}' % key, val)
-        return path
+        return items
 
     @staticmethod
     def _make_qs(items):
@@ -153,31 +170,38 @@ class UrlRule(object):
                      hard limit on URL length. See the caching section if you
                      need to persist a large amount of data between requests.
         """
-        # Convert any ints and longs to strings
-        for key, val in items.items():
+        path_items = dict(self._path_defaults)
+        qs_items = {}
+        for key, val in items.iteritems():
+            # Convert any ints and longs to strings
             if isinstance(val, (int, long)):
-                items[key] = str(val)
-
-        # First use our defaults passed when registering the rule
-        url_items = dict((key, val) for key, val in self._options.items()
-                         if key in self._keywords)
-
-        # Now update with any items explicitly passed to url_for
-        url_items.update((key, val) for key, val in items.items()
-                         if key in self._keywords)
+                val = str(val)
+            if key in self._keywords:
+                path_items[key] = val
+            else:
+                # Extra arguments get tacked on to the query string
+                qs_items[key] = val
 
         # Create the path
-        path = self._make_path(url_items)
-
-        # Extra arguments get tacked on to the query string
-        qs_items = dict((key, val) for key, val in items.items()
-                        if key not in self._keywords)
-        qs = self._make_qs(qs_items)
+        parts = list(self._path_parts)
+        for i, key in self._path_slots:
+            val = path_items[key]
+            if not isinstance(val, basestring):
+                raise TypeError('Value "%s" for key "%s" must be an instance'
+                                ' of basestring' % (val, key))
+            parts[i] = quote_plus(val)
+        path = ''.join(parts)
 
+        qs = self._make_qs(qs_items) if qs_items else None
         if qs:
             return '?'.join([path, qs])
         return path
 
+    @property
+    def pattern(self):
+        """The regex pattern of this url rule without named groups."""
+        return self._pattern
+
     @property
     def regex(self):
         """The regex for matching paths against this url rule."""
@@ -202,3 +226,52 @@ class UrlRule(object):
     def keywords(self):
         """The list of path keywords for this url rule."""
         return self._keywords
+
+
+class UrlDispatcher(object):
+    """Matches paths against a list of url rules in a single regex pass.
+
+    Rules are joined into alternations of the form ``^(?:(rule1)|(rule2))$``
+    which keep the registration order, so the first registered rule still
+    wins. The outer group of the matched alternative is the last group to
+    close, so ``match.lastindex`` identifies the rule without trying each
+    one in turn. Python 2 regexes are limited to 100 groups, so the rules
+    are split into several regexes when necessary.
+
+    :param rules: A list of `UrlRule` instances in registration order.
+    """
+
+    MAX_GROUPS = 99
+
+    def __init__(self, rules):
+        self._chunks = []
+        patterns = []
+        targets = {}
+        groups = 0
+        for rule in rules:
+            rule_groups = len(rule.keywords) + 1
+            if patterns and groups + rule_groups > self.MAX_GROUPS:
+                self._add_chunk(patterns, targets)
+                patterns, targets, groups = [], {}, 0
+            targets[groups + 1] = rule
+            patterns.append('(%s)' % rule.pattern)
+            groups += rule_groups
+        if patterns:
+            self._add_chunk(patterns, targets)
+
+    def _add_chunk(self, patterns, targets):
+        regex = re.compile('^(?:' + '|'.join(patterns) + ')$')
+        self._chunks.append((regex, targets))
+
+    def match(self, path):
+        """Returns a tuple of the matched rule and the items to be passed to
+        its view function, or (None, None) if no rule matches the path.
+        """
+        for regex, targets in self._chunks:
+            m = regex.match(path)
+            if m:
+                rule = targets[m.lastindex]
+                # keyword groups directly follow the rule's outer group
+                values = m.groups()[m.lastindex:m.lastindex + len(rule.keywords)]
+                return rule, rule.make_items(dict(zip(rule.keywords, values)))
+        return None, None
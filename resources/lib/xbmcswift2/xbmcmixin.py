@@ -42,6 +42,10 @@ class XBMCMixin(object):
 
     _function_cache_name = '.functions'
 
+    # Snapshot of raw setting values, see get_setting()
+    _settings = None
+    _settings_stats = None
+
     def cached(self, ttl=60 * 24):
         """A decorator that will cache the output of the wrapped function. The
         key used for the cache is the function name as well as the `*args` and
@@ -182,8 +186,7 @@ class XBMCMixin(object):
             * ``plugin.get_setting('content', choices=('videos', 'movies'))``
         """
         # TODO: allow pickling of settings items?
-        # TODO: STUB THIS OUT ON CLI
-        value = self.addon.getSetting(id=key)
+        value = self._get_raw_setting(key)
         if converter is str:
             return value
         elif converter is unicode:
@@ -203,13 +206,68 @@ class XBMCMixin(object):
                             'int. Acceptable choices are instances of list '
                             ' or tuple.')
 
+    def _get_raw_setting(self, key):
+        """Returns the raw (utf-8 encoded) value of the setting.
+
+        Values are read from the user's settings.xml once per snapshot, so
+        the addon API is only called for settings which are not stored there
+        yet (these are memoized as well).
+        """
+        if self._settings is None:
+            self._load_settings()
+        try:
+            value = self._settings[key]
+            self._settings_stats['hits'] += 1
+        except KeyError:
+            started = time.time()
+            value = self._settings[key] = self.addon.getSetting(id=key)
+            self._settings_stats['misses'] += 1
+            self._settings_stats['api_time'] += time.time() - started
+        return value
+
+    def _load_settings(self):
+        started = time.time()
+        self._settings = {}
+        if self._settings_stats is None:
+            self._settings_stats = {'loads': 0, 'load_time': 0.0, 'hits': 0, 'misses': 0, 'api_time': 0.0}
+        path = self.addon_data_path('settings.xml')
+        if xbmcvfs.exists(path):
+            from xml.etree import cElementTree as ElementTree
+            try:
+                for node in ElementTree.parse(path).getroot().iter('setting'):
+                    # Kodi 18+ stores the value as node text, earlier versions as an attribute
+                    value = node.get('value') if 'value' in node.attrib else node.text
+                    self._settings[node.get('id')] = ensure_str(value or '')
+            except (ElementTree.ParseError, IOError) as e:
+                log.warning('Unable to read settings snapshot from "%s": %s', path, e)
+                self._settings = {}
+        self._settings_stats['loads'] += 1
+        self._settings_stats['load_time'] += time.time() - started
+
+    def invalidate_settings(self):
+        """Drops the settings snapshot, so that changed settings are read
+        again on the next get_setting() call. Long running scripts (like
+        services) should call it periodically.
+        """
+        self._settings = None
+
+    def settings_stats(self):
+        """Returns a dict with the settings snapshot statistics: number of
+        snapshot loads and time spent on them, number of cached (hits) and
+        addon API (misses) lookups and time spent on the latter.
+        """
+        return dict(self._settings_stats or {})
+
     def set_setting(self, key, val):
         # TODO: STUB THIS OUT ON CLI
+        if self._settings is not None:
+            self._settings[key] = ensure_str(val)
         return self.addon.setSetting(id=key, value=val)
 
     def open_settings(self):
         """Opens the settings dialog within XBMC"""
         self.addon.openSettings()
+        self.invalidate_settings()
 
     @staticmethod
     def add_to_playlist(items, playlist='video'):
@@ -6,7 +6,8 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
 
 import datetime
-from mediapoisk.common import sleep, abort_requested
+from mediapoisk.common import sleep, abort_requested, store_scraper_state, dump_metrics
+from mediapoisk import container
 from mediapoisk.library import update_library
 from mediapoisk.plugin import plugin
 from xbmcswift2 import xbmc
@@ -15,12 +16,33 @@ import mediapoisk.plugin.main
 
 def safe_update():
     try:
+        # library updates give way to the requests of the plugin UI
+        container.scraper().background = True
         update_library()
         plugin.close_storages()
     except Exception as e:
         plugin.log.exception(e)
+    store_scraper_state()
+    dump_metrics(path='update_library')
+    container.metrics().reset()
+
+
+class SettingsMonitor(xbmc.Monitor):
+    def onSettingsChanged(self):
+        # settings snapshot is read again on the next get_setting()
+        plugin.invalidate_settings()
+
+
+def safe_shutdown_idle_acestream():
+    try:
+        keep_alive = plugin.get_setting('as-keep-alive', int)
+        if keep_alive and not xbmc.Player().isPlaying():
+            container.ace_stream().shutdown_idle(keep_alive * 60)
+    except Exception as e:
+        plugin.log.exception(e)
 
 if __name__ == '__main__':
+    monitor = SettingsMonitor()
     sleep(5000)
     safe_update()
     next_run = None
@@ -34,4 +56,5 @@ if __name__ == '__main__':
             if not xbmc.Player().isPlaying():
                 safe_update()
                 next_run = None
+        safe_shutdown_idle_acestream()
         sleep(1000)